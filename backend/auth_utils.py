@@ -1,12 +1,16 @@
 import os
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Iterable, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import pymongo
+from pymongo import AsyncMongoClient
 from dotenv import load_dotenv
+from cache import TTLCache
+from metrics import mongo_command_listener
 
 # Load environment variables
 load_dotenv()
@@ -19,6 +23,40 @@ ALGORITHM = os.getenv("ALGORITHM", "HS256")
 # Increase token expiration time for persistent login (e.g., 7 days)
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "10080"))  # 7 days
 
+# Authentication caches (seconds / number of entries)
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "60"))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+TOKEN_CACHE_TTL = float(os.getenv("TOKEN_CACHE_TTL", "300"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+ACCOUNT_CACHE_TTL = float(os.getenv("ACCOUNT_CACHE_TTL", "60"))
+ACCOUNT_CACHE_SIZE = int(os.getenv("ACCOUNT_CACHE_SIZE", "10000"))
+
+# Password hashing pool: bcrypt runs in worker threads (it releases the GIL),
+# with at most PASSWORD_HASH_QUEUE_LIMIT jobs waiting before we return 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "32"))
+
+# Connections each worker opens during warm_up() before it takes traffic
+WARMUP_CONNECTIONS = int(os.getenv("WARMUP_CONNECTIONS", os.getenv("MONGODB_MIN_POOL_SIZE", "4")))
+
+# MongoDB connection pool and wire options; unset values keep driver defaults.
+# Compressors are tried in order ("zstd,snappy,zlib"); zstd and snappy need
+# the pymongo[zstd,snappy] extras and are skipped with a warning otherwise.
+MONGODB_OPTIONS = {
+    option: int(os.environ[env]) if option != "compressors" else os.environ[env]
+    for option, env in (
+        ("maxPoolSize", "MONGODB_MAX_POOL_SIZE"),
+        ("minPoolSize", "MONGODB_MIN_POOL_SIZE"),
+        ("maxIdleTimeMS", "MONGODB_MAX_IDLE_TIME_MS"),
+        ("connectTimeoutMS", "MONGODB_CONNECT_TIMEOUT_MS"),
+        ("socketTimeoutMS", "MONGODB_SOCKET_TIMEOUT_MS"),
+        ("serverSelectionTimeoutMS", "MONGODB_SERVER_SELECTION_TIMEOUT_MS"),
+        ("waitQueueTimeoutMS", "MONGODB_WAIT_QUEUE_TIMEOUT_MS"),
+        ("compressors", "MONGODB_COMPRESSORS"),
+    )
+    if os.getenv(env)
+}
+
 # Validate required environment variables
 if not MONGODB_URL:
     raise ValueError("MONGODB_URL environment variable is required")
@@ -27,23 +65,66 @@ if not SECRET_KEY:
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+password_executor = ThreadPoolExecutor(
+    max_workers=PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_password_jobs = 0
 
 # JWT token scheme
 security = HTTPBearer()
 
-# MongoDB connection
-try:
-    client = pymongo.MongoClient(MONGODB_URL)
-    db = client[DATABASE_NAME]
-    users_collection = db.users
-    accounts_collection = db.accounts
-    transactions_collection = db.transactions
-    # Test connection
-    client.admin.command('ping')
-    print("✅ Successfully connected to MongoDB!")
-except Exception as e:
-    print(f"❌ Failed to connect to MongoDB: {e}")
-    raise
+# User documents keyed by token subject (email), and decoded token payloads
+# keyed by the raw bearer token, so authenticated requests skip both the
+# users lookup and HS256 verification on repeat calls.
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+
+# Set of account ids owned by each user, for ownership checks on the
+# transaction routes. Dropped on account create/delete in this process;
+# other workers catch up on a miss (see get_user_account_ids) or after the TTL.
+account_ids_cache = TTLCache(maxsize=ACCOUNT_CACHE_SIZE, ttl=ACCOUNT_CACHE_TTL)
+
+# MongoDB connection (async driver, so queries never block the event loop).
+# Creating the client does no I/O: the app's lifespan opens it with
+# connect_database() and closes it on shutdown, and the collection handles
+# below can be imported anywhere in the meantime.
+client = AsyncMongoClient(
+    MONGODB_URL,
+    connect=False,
+    event_listeners=[mongo_command_listener],
+    **MONGODB_OPTIONS
+)
+db = client[DATABASE_NAME]
+users_collection = db.users
+accounts_collection = db.accounts
+transactions_collection = db.transactions
+
+async def connect_database():
+    # Open the connection pool and test it
+    try:
+        await client.aconnect()
+        await client.admin.command('ping')
+        print("✅ Successfully connected to MongoDB!")
+    except Exception as e:
+        print(f"❌ Failed to connect to MongoDB: {e}")
+        raise
+
+async def warm_up():
+    """
+    Pay a fresh worker's one-off costs before it serves requests: open
+    WARMUP_CONNECTIONS pooled connections (concurrent pings each check one
+    out), and start the password threads and load the bcrypt backend, which
+    self-tests on first use.
+    """
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(
+        *(client.admin.command('ping') for _ in range(WARMUP_CONNECTIONS)),
+        *(
+            loop.run_in_executor(password_executor, pwd_context.handler().get_backend)
+            for _ in range(PASSWORD_HASH_WORKERS)
+        )
+    )
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -51,6 +132,31 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def run_password_job(func, *args):
+    """
+    Run a bcrypt operation on the password pool so it doesn't block the event
+    loop. Raises 503 when the pool and its queue are full.
+    """
+    global _password_jobs
+    if _password_jobs >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_LIMIT:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server is busy, please try again",
+            headers={"Retry-After": "1"},
+        )
+    _password_jobs += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_executor, func, *args)
+    finally:
+        _password_jobs -= 1
+
+async def verify_password_async(plain_password, hashed_password):
+    return await run_password_job(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    return await run_password_job(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -61,7 +167,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -70,7 +176,9 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     
     try:
         token = credentials.credentials
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = token_cache.get(token)
+        if payload is None:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -83,11 +191,16 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
         # Convert timestamp to datetime
         exp_datetime = datetime.utcfromtimestamp(exp_timestamp)
         if exp_datetime < datetime.utcnow():
+            token_cache.delete(token)
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token has expired",
                 headers={"WWW-Authenticate": "Bearer"},
             )
+        
+        # Never keep a token cached past its expiry
+        remaining = (exp_datetime - datetime.utcnow()).total_seconds()
+        token_cache.set(token, payload, ttl=min(TOKEN_CACHE_TTL, remaining))
             
     except JWTError as e:
         print(f"JWT Error: {e}")
@@ -96,10 +209,44 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
         print(f"Token verification error: {e}")
         raise credentials_exception
     
-    user = users_collection.find_one({"email": email})
+    user = user_cache.get(email)
     if user is None:
-        raise credentials_exception
-    return user
+        user = await users_collection.find_one({"email": email})
+        if user is None:
+            raise credentials_exception
+        user_cache.set(email, user)
+    # Hand out a copy so handlers can't mutate the cached document
+    return dict(user)
+
+def invalidate_user(email: str):
+    """Drop a cached user document after the user is changed or deleted."""
+    user_cache.delete(email)
+
+async def get_user_account_ids(user_id: str, require: Iterable[str] = ()) -> frozenset:
+    """
+    Ids of the user's accounts, cached per user. A cached set that lacks any
+    id in `require` is reloaded once, so an account created through another
+    worker is found without waiting for the TTL.
+    """
+    account_ids = account_ids_cache.get(user_id)
+    if account_ids is None or not account_ids.issuperset(require):
+        account_ids = frozenset([
+            str(account["_id"])
+            async for account in accounts_collection.find({"user_id": user_id}, {"_id": 1})
+        ])
+        account_ids_cache.set(user_id, account_ids)
+    return account_ids
+
+def invalidate_user_accounts(user_id: str):
+    """Drop the cached account ids after one of the user's accounts is created or deleted."""
+    account_ids_cache.delete(user_id)
+
+def auth_cache_stats() -> dict:
+    return {
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "account_ids": account_ids_cache.stats()
+    }
 
 def get_current_user(current_user: dict = Depends(verify_token)):
     return current_user
\ No newline at end of file
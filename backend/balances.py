@@ -0,0 +1,146 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+from typing import Optional
+from bson import ObjectId
+from pymongo import UpdateOne
+from auth_utils import accounts_collection, transactions_collection
+
+# Balances are stored on the account document and kept up to date with $inc
+# on every transaction write. An Inflow credits its to_account, an Outflow
+# debits its from_account (same rules the app used to compute on-device).
+
+
+def balance_deltas(transaction_doc: Optional[dict], sign: int = 1) -> dict:
+    """
+    Return {account_id: (inflow, outflow)} contributed by a transaction.
+    Use sign=-1 to get the deltas that undo the transaction.
+    """
+    deltas = {}
+    if not transaction_doc:
+        return deltas
+
+    amount = transaction_doc.get("amount") or 0
+    if transaction_doc.get("type") == "Inflow" and transaction_doc.get("to_account_id"):
+        deltas[transaction_doc["to_account_id"]] = (sign * amount, 0)
+    elif transaction_doc.get("type") == "Outflow" and transaction_doc.get("from_account_id"):
+        deltas[transaction_doc["from_account_id"]] = (0, sign * amount)
+    return deltas
+
+
+async def apply_balance_changes(
+    user_id: str,
+    old_docs: Optional[list] = None,
+    new_docs: Optional[list] = None
+):
+    """
+    Remove the contribution of old_docs and add the contribution of new_docs
+    to the stored account balances, in a single bulk write.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for doc in old_docs or []:
+        for account_id, (inflow, outflow) in balance_deltas(doc, -1).items():
+            totals[account_id][0] += inflow
+            totals[account_id][1] += outflow
+    for doc in new_docs or []:
+        for account_id, (inflow, outflow) in balance_deltas(doc).items():
+            totals[account_id][0] += inflow
+            totals[account_id][1] += outflow
+
+    operations = []
+    for account_id, (inflow, outflow) in totals.items():
+        if not inflow and not outflow:
+            continue
+        try:
+            obj_id = ObjectId(account_id)
+        except Exception:
+            continue
+        operations.append(UpdateOne(
+            {"_id": obj_id, "user_id": user_id},
+            {"$inc": {
+                "balance": inflow - outflow,
+                "total_inflow": inflow,
+                "total_outflow": outflow
+            }}
+        ))
+
+    if operations:
+        await accounts_collection.bulk_write(operations, ordered=False)
+
+
+def serialize_balance(account: dict) -> dict:
+    return {
+        "account_id": str(account["_id"]),
+        "name": account.get("name"),
+        "balance": round(account.get("balance", 0), 2),
+        "total_inflow": round(account.get("total_inflow", 0), 2),
+        "total_outflow": round(account.get("total_outflow", 0), 2)
+    }
+
+
+async def rebuild_balances(user_id: Optional[str] = None) -> int:
+    """
+    Recompute stored balances from the transactions collection in a single
+    aggregation pass. Returns the number of accounts reconciled.
+    """
+    match = {"user_id": user_id} if user_id else {}
+    pipeline = [
+        {"$match": match},
+        {
+            "$project": {
+                "user_id": 1,
+                "account_id": {
+                    "$cond": [{"$eq": ["$type", "Inflow"]}, "$to_account_id", "$from_account_id"]
+                },
+                "inflow": {"$cond": [{"$eq": ["$type", "Inflow"]}, "$amount", 0]},
+                "outflow": {"$cond": [{"$eq": ["$type", "Outflow"]}, "$amount", 0]}
+            }
+        },
+        {"$match": {"account_id": {"$nin": [None, ""]}}},
+        {
+            "$group": {
+                "_id": {"user_id": "$user_id", "account_id": "$account_id"},
+                "total_inflow": {"$sum": "$inflow"},
+                "total_outflow": {"$sum": "$outflow"}
+            }
+        }
+    ]
+
+    # Reset first so accounts without transactions end up at zero
+    await accounts_collection.update_many(
+        match,
+        {"$set": {"balance": 0, "total_inflow": 0, "total_outflow": 0}}
+    )
+
+    operations = []
+    cursor = await transactions_collection.aggregate(pipeline)
+    async for result in cursor:
+        try:
+            obj_id = ObjectId(result["_id"]["account_id"])
+        except Exception:
+            continue
+        operations.append(UpdateOne(
+            {"_id": obj_id, "user_id": result["_id"]["user_id"]},
+            {"$set": {
+                "balance": result["total_inflow"] - result["total_outflow"],
+                "total_inflow": result["total_inflow"],
+                "total_outflow": result["total_outflow"],
+                "balances_rebuilt_at": datetime.utcnow()
+            }}
+        ))
+        if len(operations) >= 1000:
+            await accounts_collection.bulk_write(operations, ordered=False)
+            operations = []
+
+    if operations:
+        await accounts_collection.bulk_write(operations, ordered=False)
+
+    return await accounts_collection.count_documents(match)
+
+
+if __name__ == "__main__":
+    import sys
+
+    target_user = sys.argv[1] if len(sys.argv) > 1 else None
+    count = asyncio.run(rebuild_balances(target_user))
+    print(f"✅ Rebuilt balances for {count} account(s)")
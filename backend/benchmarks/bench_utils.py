@@ -0,0 +1,84 @@
+"""
+Shared helpers for the benchmark scripts.
+
+The benchmarks talk to a running API server over HTTP (stdlib only), so the
+same script can be pointed at the old and the new build and the numbers
+compared side by side.
+"""
+import json
+import os
+import statistics
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+BASE_URL = os.getenv("BENCH_BASE_URL", "http://localhost:8000")
+
+
+def request(method, path, token=None, body=None, headers=None, base_url=BASE_URL):
+    """Send one request and return (status, body_bytes, elapsed_seconds)."""
+    data = None
+    all_headers = dict(headers or {})
+    if body is not None:
+        data = json.dumps(body, default=str).encode()
+        all_headers["Content-Type"] = "application/json"
+    if token:
+        all_headers["Authorization"] = f"Bearer {token}"
+
+    req = urllib.request.Request(base_url + path, data=data, method=method, headers=all_headers)
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            payload = resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        payload = e.read()
+        status = e.code
+    return status, payload, time.perf_counter() - start
+
+
+def create_bench_user(base_url=BASE_URL):
+    """Sign up a throwaway user and return its bearer token."""
+    email = f"bench_{uuid.uuid4().hex[:12]}@example.com"
+    status, payload, _ = request(
+        "POST", "/auth/signup",
+        body={"full_name": "Benchmark User", "email": email, "password": "bench-password"},
+        base_url=base_url,
+    )
+    if status != 200:
+        raise RuntimeError(f"Could not create benchmark user: {status} {payload[:200]!r}")
+    return json.loads(payload)["access_token"]
+
+
+def create_bench_account(token, name="Bench Account", base_url=BASE_URL):
+    status, payload, _ = request(
+        "POST", "/accounts/", token=token,
+        body={"name": name, "account_type": "Bank"},
+        base_url=base_url,
+    )
+    if status != 200:
+        raise RuntimeError(f"Could not create benchmark account: {status} {payload[:200]!r}")
+    return json.loads(payload)["account"]["id"]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(label, latencies, elapsed=None):
+    """Print count, throughput and latency percentiles (in ms) for a run."""
+    line = f"{label}: n={len(latencies)}"
+    if elapsed:
+        line += f"  rps={len(latencies) / elapsed:.1f}"
+    if latencies:
+        line += (
+            f"  mean={statistics.mean(latencies) * 1000:.1f}ms"
+            f"  p50={percentile(latencies, 50) * 1000:.1f}ms"
+            f"  p99={percentile(latencies, 99) * 1000:.1f}ms"
+        )
+    print(line)
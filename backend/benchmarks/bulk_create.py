@@ -0,0 +1,64 @@
+"""
+Bulk create benchmark: POST /transactions/multiple throughput by batch size.
+
+Run the API server, then:
+
+    python benchmarks/bulk_create.py --transactions 20000 --batch-sizes 1,50,200,500
+
+Reports transactions per second for each batch size. Use it to pick
+MAX_BULK_TRANSACTIONS: past some size the per-request gain flattens out
+while request latency keeps growing.
+"""
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from bench_utils import BASE_URL, create_bench_account, create_bench_user, request, summarize
+
+
+def make_batch(account_id, start_index, size):
+    start = datetime(2020, 1, 1)
+    return [
+        {
+            "type": "Outflow",
+            "amount": 1 + (i % 100),
+            "from_account_id": account_id,
+            "detail": f"bulk {i}",
+            "transaction_date": (start + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(start_index, start_index + size)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--transactions", type=int, default=20000, help="Transactions created per batch size")
+    parser.add_argument("--batch-sizes", default="1,50,200,500")
+    args = parser.parse_args()
+
+    token = create_bench_user(args.base_url)
+    account_id = create_bench_account(token, base_url=args.base_url)
+
+    for batch_size in [int(size) for size in args.batch_sizes.split(",")]:
+        latencies = []
+        created = 0
+        started = time.perf_counter()
+        while created < args.transactions:
+            size = min(batch_size, args.transactions - created)
+            status, payload, elapsed = request(
+                "POST", "/transactions/multiple", token=token,
+                body={"transactions": make_batch(account_id, created, size)},
+                base_url=args.base_url,
+            )
+            if status != 200:
+                raise SystemExit(f"batch size {batch_size}: HTTP {status} {payload[:200]!r}")
+            latencies.append(elapsed)
+            created += size
+        total = time.perf_counter() - started
+        summarize(f"batch {batch_size:4d}", latencies, total)
+        print(f"batch {batch_size:4d}: {created / total:10.0f} transactions/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Concurrency benchmark: requests/sec with many parallel clients.
+
+Run the API server, then:
+
+    python benchmarks/concurrency.py --clients 200 --duration 20
+
+Run it once against the old (blocking pymongo) build and once against the
+async driver build to compare throughput under the same load.
+"""
+import argparse
+import threading
+import time
+
+from bench_utils import BASE_URL, create_bench_account, create_bench_user, request, summarize
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds to run")
+    parser.add_argument("--path", default="/transactions/?limit=50")
+    args = parser.parse_args()
+
+    token = create_bench_user(args.base_url)
+    account_id = create_bench_account(token, base_url=args.base_url)
+    for i in range(50):
+        request("POST", "/transactions/", token=token, base_url=args.base_url, body={
+            "type": "Inflow", "amount": 10 + i, "to_account_id": account_id, "detail": f"seed {i}",
+        })
+
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.duration
+
+    def worker():
+        local = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            status, _, elapsed = request("GET", args.path, token=token, base_url=args.base_url)
+            if status == 200:
+                local.append(elapsed)
+            else:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(args.clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    summarize(f"GET {args.path} with {args.clients} clients", latencies, elapsed)
+    print(f"errors: {errors[0]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Pagination benchmark: page fetch latency at increasing depth, offset vs cursor.
+
+Run the API server, then:
+
+    python benchmarks/pagination.py --transactions 20000
+
+Offset pages get slower the deeper they are (the server skips every earlier
+row); cursor pages should stay flat.
+"""
+import argparse
+import json
+from datetime import datetime, timedelta
+
+from bench_utils import BASE_URL, create_bench_account, create_bench_user, request, summarize
+
+
+def seed(token, account_id, count, base_url):
+    start = datetime(2015, 1, 1)
+    for batch_start in range(0, count, 50):
+        batch = [
+            {
+                "type": "Outflow",
+                "amount": 1 + (i % 100),
+                "from_account_id": account_id,
+                "detail": f"seed {i}",
+                "transaction_date": (start + timedelta(minutes=i)).isoformat(),
+            }
+            for i in range(batch_start, min(batch_start + 50, count))
+        ]
+        request("POST", "/transactions/multiple", token=token, body={"transactions": batch}, base_url=base_url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--transactions", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--samples", type=int, default=5, help="Repeats per depth")
+    args = parser.parse_args()
+
+    token = create_bench_user(args.base_url)
+    account_id = create_bench_account(token, base_url=args.base_url)
+    seed(token, account_id, args.transactions, args.base_url)
+
+    # Walk the whole history once with cursors, remembering the cursor at each page
+    cursors = [None]
+    cursor = None
+    while True:
+        path = f"/transactions/?limit={args.limit}" + (f"&cursor={cursor}" if cursor else "")
+        _, payload, _ = request("GET", path, token=token, base_url=args.base_url)
+        cursor = json.loads(payload).get("next_cursor")
+        if not cursor:
+            break
+        cursors.append(cursor)
+
+    depths = sorted({0, len(cursors) // 4, len(cursors) // 2, len(cursors) - 1})
+    for page in depths:
+        offset_latencies = []
+        cursor_latencies = []
+        for _ in range(args.samples):
+            _, _, elapsed = request(
+                "GET", f"/transactions/?limit={args.limit}&offset={page * args.limit}",
+                token=token, base_url=args.base_url,
+            )
+            offset_latencies.append(elapsed)
+            path = f"/transactions/?limit={args.limit}"
+            if cursors[page]:
+                path += f"&cursor={cursors[page]}"
+            _, _, elapsed = request("GET", path, token=token, base_url=args.base_url)
+            cursor_latencies.append(elapsed)
+        summarize(f"page {page:5d} offset", offset_latencies)
+        summarize(f"page {page:5d} cursor", cursor_latencies)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Serialization benchmark: cost of rendering a 100-item GET /transactions page.
+
+Runs in-process (no server or database needed), from the backend directory:
+
+    python benchmarks/serialization.py --items 100 --iterations 2000
+
+Compares the old path (hand-built dicts, FastAPI's jsonable_encoder, then
+json.dumps) with the shared serializer plus ORJSONResponse, reporting time
+and allocated memory per page.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from bson import ObjectId
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from serializers import ORJSONResponse, serialize_transaction  # noqa: E402
+
+
+def make_docs(count):
+    now = datetime.utcnow()
+    user_id = str(ObjectId())
+    account_id = str(ObjectId())
+    return [
+        {
+            "_id": ObjectId(),
+            "type": "Outflow",
+            "amount": 12.5 + i,
+            "from_account_id": account_id,
+            "to_account_id": None,
+            "account_ids": [account_id],
+            "detail": f"Coffee and a sandwich #{i}",
+            "document_files": [],
+            "user_id": user_id,
+            "transaction_date": now - timedelta(hours=i),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def render_old(docs):
+    transactions = []
+    for transaction in docs:
+        transactions.append({
+            "id": str(transaction["_id"]),
+            "type": transaction["type"],
+            "amount": transaction["amount"],
+            "from_account_id": transaction.get("from_account_id"),
+            "to_account_id": transaction.get("to_account_id"),
+            "detail": transaction["detail"],
+            "document_files": transaction.get("document_files", []),
+            "user_id": transaction["user_id"],
+            "transaction_date": transaction["transaction_date"],
+            "created_at": transaction["created_at"],
+            "updated_at": transaction["updated_at"],
+        })
+    content = jsonable_encoder({"transactions": transactions, "count": len(transactions)})
+    return json.dumps(content, separators=(",", ":")).encode()
+
+
+def render_new(docs):
+    transactions = [serialize_transaction(doc) for doc in docs]
+    return ORJSONResponse({"transactions": transactions, "count": len(transactions)}).body
+
+
+def measure(label, render, docs, iterations):
+    render(docs)  # warm up
+    start = time.perf_counter()
+    for _ in range(iterations):
+        render(docs)
+    per_page = (time.perf_counter() - start) / iterations
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    body = render(docs)
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+
+    print(f"{label}: {per_page * 1e6:8.1f} us/page  peak alloc {peak / 1024:7.1f} KiB  body {len(body)} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    docs = make_docs(args.items)
+    measure("jsonable_encoder + json", render_old, docs, args.iterations)
+    measure("serializer + orjson    ", render_new, docs, args.iterations)
+
+
+if __name__ == "__main__":
+    main()
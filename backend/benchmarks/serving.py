@@ -0,0 +1,129 @@
+"""
+Serving benchmark: throughput of the single-process dev server against the
+pre-forked production server (serve.py).
+
+Run from the backend directory (MongoDB must be reachable with the settings
+in .env); the script starts and stops each server itself:
+
+    python benchmarks/serving.py --duration 20 --client-processes 4
+    python benchmarks/serving.py --modes workers --env WEB_CONCURRENCY=8
+
+Load comes from several client processes so the Python client isn't the
+bottleneck; give it cores of its own (or another machine) for clean numbers.
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from bench_utils import create_bench_account, create_bench_user, request, summarize
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODES = {
+    # what main.py's __main__ runs, minus the reloader: one process, one loop
+    "single": lambda port: [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+    "workers": lambda port: [sys.executable, "serve.py"],
+}
+
+
+def start_server(mode, port, env, timeout):
+    env = dict(env, HOST="127.0.0.1", PORT=str(port))
+    process = subprocess.Popen(MODES[mode](port), cwd=BACKEND_DIR, env=env)
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process.poll() is not None:
+            raise SystemExit(f"{mode} server exited with code {process.returncode}")
+        try:
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                if resp.status == 200:
+                    return process
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.05)
+    process.terminate()
+    raise SystemExit(f"{mode} server did not answer within {timeout}s")
+
+
+def client_process(base_url, token, path, clients, duration):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local = []
+        local_errors = 0
+        while time.perf_counter() < deadline:
+            status, _, elapsed = request("GET", path, token=token, base_url=base_url)
+            if status == 200:
+                local.append(elapsed)
+            else:
+                local_errors += 1
+        with lock:
+            latencies.extend(local)
+            errors[0] += local_errors
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, errors[0]
+
+
+def run_load(base_url, args):
+    token = create_bench_user(base_url)
+    account_id = create_bench_account(token, base_url=base_url)
+    for i in range(50):
+        request("POST", "/transactions/", token=token, base_url=base_url, body={
+            "type": "Inflow", "amount": 10 + i, "to_account_id": account_id, "detail": f"seed {i}",
+        })
+
+    per_process = max(1, args.clients // args.client_processes)
+    with multiprocessing.Pool(args.client_processes) as pool:
+        start = time.perf_counter()
+        results = pool.starmap(
+            client_process,
+            [(base_url, token, args.path, per_process, args.duration)] * args.client_processes
+        )
+        elapsed = time.perf_counter() - start
+
+    latencies = [latency for result, _ in results for latency in result]
+    errors = sum(errors for _, errors in results)
+    return latencies, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", default="single,workers", help="Comma-separated: single, workers")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--clients", type=int, default=200, help="Total concurrent clients")
+    parser.add_argument("--client-processes", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per mode")
+    parser.add_argument("--path", default="/transactions/?limit=50")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE passed to the server")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.update(item.split("=", 1) for item in args.env)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    for mode in args.modes.split(","):
+        process = start_server(mode, args.port, env, args.timeout)
+        try:
+            latencies, errors, elapsed = run_load(base_url, args)
+        finally:
+            process.terminate()
+            process.wait()
+        summarize(f"{mode}: GET {args.path} with {args.clients} clients", latencies, elapsed)
+        print(f"errors: {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Sign-in storm load test: /transactions latency while many clients log in.
+
+Run the API server, then:
+
+    python benchmarks/signin_storm.py --signin-clients 50 --duration 15
+
+Prints GET /transactions latency first without, then during, a burst of
+concurrent sign-ins. With bcrypt on the password pool the p99 should stay
+roughly flat; 503s from a saturated pool are counted separately.
+"""
+import argparse
+import threading
+import time
+import uuid
+
+from bench_utils import BASE_URL, create_bench_account, create_bench_user, request, summarize
+
+
+def measure_reads(token, duration, clients, base_url):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        local = []
+        while time.perf_counter() < deadline:
+            status, _, elapsed = request("GET", "/transactions/?limit=20", token=token, base_url=base_url)
+            if status == 200:
+                local.append(elapsed)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--signin-clients", type=int, default=50)
+    parser.add_argument("--read-clients", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=15.0)
+    args = parser.parse_args()
+
+    token = create_bench_user(args.base_url)
+    account_id = create_bench_account(token, base_url=args.base_url)
+    for i in range(20):
+        request("POST", "/transactions/", token=token, base_url=args.base_url, body={
+            "type": "Inflow", "amount": 5, "to_account_id": account_id, "detail": f"seed {i}",
+        })
+
+    email = f"storm_{uuid.uuid4().hex[:12]}@example.com"
+    request("POST", "/auth/signup", base_url=args.base_url,
+            body={"full_name": "Storm User", "email": email, "password": "storm-password"})
+
+    summarize("GET /transactions (baseline)", measure_reads(token, args.duration, args.read_clients, args.base_url))
+
+    stop = threading.Event()
+    outcomes = {"ok": 0, "busy": 0, "other": 0}
+    lock = threading.Lock()
+
+    def sign_in():
+        while not stop.is_set():
+            status, _, _ = request("POST", "/auth/signin", base_url=args.base_url,
+                                   body={"email": email, "password": "storm-password"})
+            key = "ok" if status == 200 else "busy" if status == 503 else "other"
+            with lock:
+                outcomes[key] += 1
+
+    storm = [threading.Thread(target=sign_in) for _ in range(args.signin_clients)]
+    for t in storm:
+        t.start()
+    latencies = measure_reads(token, args.duration, args.read_clients, args.base_url)
+    stop.set()
+    for t in storm:
+        t.join()
+
+    summarize("GET /transactions (during sign-in storm)", latencies)
+    print(f"sign-ins: {outcomes['ok']} ok, {outcomes['busy']} rejected with 503, {outcomes['other']} other")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Startup benchmark: time from launching the API process to its first
+successful request.
+
+Run from the backend directory (MongoDB must be reachable with the settings
+in .env); the script starts and stops the server itself:
+
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py --runs 5 --env CREATE_DB_INDEXES=true
+
+Extra --env values are passed to the server, so the same command can
+compare pool settings, index creation on/off, or an older build.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+from bench_utils import percentile
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def time_to_first_request(port, env, timeout):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+        env=env,
+    )
+    start = time.perf_counter()
+    try:
+        while time.perf_counter() - start < timeout:
+            if process.poll() is not None:
+                raise SystemExit(f"server exited with code {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.01)
+        raise SystemExit(f"server did not answer within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--env", action="append", default=[], help="KEY=VALUE passed to the server")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.update(item.split("=", 1) for item in args.env)
+
+    samples = []
+    for run in range(args.runs):
+        elapsed = time_to_first_request(args.port, env, args.timeout)
+        samples.append(elapsed)
+        print(f"run {run + 1}: {elapsed * 1000:.0f}ms")
+    print(
+        f"time to first request: min={min(samples) * 1000:.0f}ms"
+        f"  p50={percentile(samples, 50) * 1000:.0f}ms  max={max(samples) * 1000:.0f}ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
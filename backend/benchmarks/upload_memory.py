@@ -0,0 +1,96 @@
+"""
+Upload memory benchmark: server RSS during many concurrent uploads.
+
+Run the API server (note its PID), then:
+
+    python benchmarks/upload_memory.py --server-pid <pid> --uploads 50 --size-mb 9
+
+Samples the server's resident set size from /proc while the uploads run and
+prints the peak, so the streamed-to-disk path can be compared with the old
+read-everything-into-memory path. Linux only for the RSS sampling.
+"""
+import argparse
+import os
+import threading
+import time
+import urllib.request
+import uuid
+
+from bench_utils import BASE_URL, create_bench_user, summarize
+
+
+def rss_mb(pid):
+    with open(f"/proc/{pid}/status") as status_file:
+        for line in status_file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def upload(token, payload, base_url):
+    boundary = uuid.uuid4().hex
+    head = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="files"; filename="bench.pdf"\r\n'
+        f"Content-Type: application/pdf\r\n\r\n"
+    ).encode()
+    body = head + payload + f"\r\n--{boundary}--\r\n".encode()
+    req = urllib.request.Request(
+        base_url + "/transactions/upload-files", data=body, method="POST",
+        headers={
+            "Authorization": f"Bearer {token}",
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+        },
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(req, timeout=300) as resp:
+        resp.read()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--server-pid", type=int, required=True)
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--size-mb", type=float, default=9.0)
+    args = parser.parse_args()
+
+    token = create_bench_user(args.base_url)
+    payload = os.urandom(int(args.size_mb * 1024 * 1024))
+
+    baseline = rss_mb(args.server_pid)
+    peak = [baseline]
+    done = threading.Event()
+
+    def sampler():
+        while not done.is_set():
+            peak[0] = max(peak[0], rss_mb(args.server_pid))
+            time.sleep(0.05)
+
+    latencies = []
+    lock = threading.Lock()
+
+    def worker():
+        elapsed = upload(token, payload, args.base_url)
+        with lock:
+            latencies.append(elapsed)
+
+    sampler_thread = threading.Thread(target=sampler)
+    sampler_thread.start()
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker) for _ in range(args.uploads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    done.set()
+    sampler_thread.join()
+
+    summarize(f"{args.uploads} concurrent {args.size_mb}MB uploads", latencies, elapsed)
+    print(f"server RSS: baseline={baseline:.1f}MB peak={peak[0]:.1f}MB growth={peak[0] - baseline:.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
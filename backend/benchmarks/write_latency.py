@@ -0,0 +1,61 @@
+"""
+Write-path latency benchmark: per-endpoint latency for single-item mutations.
+
+Run the API server, then:
+
+    python benchmarks/write_latency.py --iterations 500
+
+Measures POST /transactions/, PUT /transactions/{id} (plain field change and
+account move), DELETE /transactions/{id} and PUT /accounts/{id}. Each of
+these should cost one or two database round trips; compare p50/p99 before
+and after a change to the write paths.
+"""
+import argparse
+import json
+
+from bench_utils import BASE_URL, create_bench_account, create_bench_user, request, summarize
+
+
+def timed(method, path, token, body, base_url):
+    status, payload, elapsed = request(method, path, token=token, body=body, base_url=base_url)
+    if status != 200:
+        raise SystemExit(f"{method} {path}: HTTP {status} {payload[:200]!r}")
+    return json.loads(payload), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--iterations", type=int, default=500)
+    args = parser.parse_args()
+
+    token = create_bench_user(args.base_url)
+    account_a = create_bench_account(token, name="Bench A", base_url=args.base_url)
+    account_b = create_bench_account(token, name="Bench B", base_url=args.base_url)
+
+    latencies = {name: [] for name in ("create", "update", "move", "delete", "update_account")}
+    for i in range(args.iterations):
+        payload, elapsed = timed("POST", "/transactions/", token, {
+            "type": "Outflow", "amount": 10, "from_account_id": account_a, "detail": f"latency {i}",
+        }, args.base_url)
+        latencies["create"].append(elapsed)
+        transaction_id = payload["transaction"]["id"]
+
+        _, elapsed = timed("PUT", f"/transactions/{transaction_id}", token, {"amount": 12}, args.base_url)
+        latencies["update"].append(elapsed)
+
+        _, elapsed = timed("PUT", f"/transactions/{transaction_id}", token, {"from_account_id": account_b}, args.base_url)
+        latencies["move"].append(elapsed)
+
+        _, elapsed = timed("DELETE", f"/transactions/{transaction_id}", token, None, args.base_url)
+        latencies["delete"].append(elapsed)
+
+        _, elapsed = timed("PUT", f"/accounts/{account_a}", token, {"name": f"Bench A {i}"}, args.base_url)
+        latencies["update_account"].append(elapsed)
+
+    for name, values in latencies.items():
+        summarize(name, values)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,43 +1,80 @@
 import os
-import pymongo
+import asyncio
 from dotenv import load_dotenv
 
 load_dotenv()
 
-MONGODB_URL = os.getenv("MONGODB_URL")
-DATABASE_NAME = os.getenv("DATABASE_NAME", "finance_app")
-
-def create_indexes():
+async def create_indexes(db):
+    """
+    Ensure every index the app relies on. Safe to re-run (existing indexes
+    are left alone). The API runs this as a background task at startup when
+    CREATE_DB_INDEXES=true; it can also be run directly.
+    """
     try:
-        client = pymongo.MongoClient(MONGODB_URL)
-        db = client[DATABASE_NAME]
-        
         # Transaction indexes
         transactions_collection = db.transactions
         
         # Index for user_id (most common query)
-        transactions_collection.create_index("user_id")
+        await transactions_collection.create_index("user_id")
         
         # Index for user_id + transaction_date (for sorting and date filtering)
-        transactions_collection.create_index([("user_id", 1), ("transaction_date", -1)])
+        await transactions_collection.create_index([("user_id", 1), ("transaction_date", -1)])
+        
+        # Index for keyset pagination (transaction_date with _id as tie-breaker)
+        await transactions_collection.create_index([("user_id", 1), ("transaction_date", -1), ("_id", -1)])
+        
+        # Multikey index for account-filtered listing (account_ids holds from/to account)
+        await transactions_collection.create_index(
+            [("user_id", 1), ("account_ids", 1), ("transaction_date", -1), ("_id", -1)]
+        )
+        
+        # Delta sync watermark (updated_at with _id as tie-breaker)
+        await transactions_collection.create_index([("user_id", 1), ("updated_at", 1), ("_id", 1)])
         
         # Index for user_id + from_account_id
-        transactions_collection.create_index([("user_id", 1), ("from_account_id", 1)])
+        await transactions_collection.create_index([("user_id", 1), ("from_account_id", 1)])
         
         # Index for user_id + to_account_id
-        transactions_collection.create_index([("user_id", 1), ("to_account_id", 1)])
+        await transactions_collection.create_index([("user_id", 1), ("to_account_id", 1)])
         
         # Compound index for analytics queries
-        transactions_collection.create_index([("user_id", 1), ("type", 1), ("transaction_date", -1)])
+        await transactions_collection.create_index([("user_id", 1), ("type", 1), ("transaction_date", -1)])
+        
+        # Analytics rollups: one document per (user, account, granularity, bucket, type)
+        await db.transaction_rollups.create_index(
+            [("user_id", 1), ("account_id", 1), ("granularity", 1), ("bucket", 1), ("type", 1)],
+            unique=True
+        )
+        
+        # Delta sync tombstones, expired after the retention window
+        await db.sync_tombstones.create_index([("user_id", 1), ("deleted_at", 1), ("_id", 1)])
+        await db.sync_tombstones.create_index(
+            "deleted_at",
+            expireAfterSeconds=int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30")) * 86400
+        )
+        
+        # Multikey index on attachments, for the orphan sweeper's reference checks
+        await transactions_collection.create_index("document_files")
+        
+        # Attachment handles (one per upload) by owner, and by age for the orphan sweeper
+        await db.transaction_files.create_index("user_id")
+        await db.transaction_files.create_index("created_at")
+        
+        # Background jobs: stale-job scan, and cleanup of finished jobs
+        await db.jobs.create_index([("status", 1), ("heartbeat_at", 1)])
+        await db.jobs.create_index(
+            "finished_at",
+            expireAfterSeconds=int(os.getenv("JOB_RETENTION_DAYS", "7")) * 86400
+        )
         
         # Account indexes (if not already created)
         accounts_collection = db.accounts
-        accounts_collection.create_index("user_id")
-        accounts_collection.create_index([("user_id", 1), ("name", 1)])
+        await accounts_collection.create_index("user_id")
+        await accounts_collection.create_index([("user_id", 1), ("name", 1)])
         
         # User indexes
         users_collection = db.users
-        users_collection.create_index("email", unique=True)
+        await users_collection.create_index("email", unique=True)
         
         print("✅ Database indexes created successfully!")
         
@@ -45,4 +82,10 @@ def create_indexes():
         print(f"❌ Error creating indexes: {e}")
 
 if __name__ == "__main__":
-    create_indexes()
\ No newline at end of file
+    from auth_utils import client, db
+
+    async def main():
+        await create_indexes(db)
+        await client.close()
+
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,178 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, List
+import anyio
+
+# pyarrow is optional (requirements-optional.txt); without it format=parquet
+# is rejected
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = None
+
+# Streaming encoders for transaction exports.
+#
+# Each encoder consumes an async iterator of transaction documents in
+# batches and yields encoded bytes, so memory use is bounded by one batch
+# no matter how many transactions are exported.
+
+EXPORT_FIELDS = [
+    "id",
+    "transaction_date",
+    "type",
+    "amount",
+    "from_account_id",
+    "to_account_id",
+    "detail",
+    "document_files",
+    "created_at",
+    "updated_at",
+]
+
+# Only the exported fields are read from MongoDB (_id is included by default)
+EXPORT_PROJECTION = {field: 1 for field in EXPORT_FIELDS if field != "id"}
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def parquet_available() -> bool:
+    return pa is not None
+
+
+def export_record(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "transaction_date": doc["transaction_date"],
+        "type": doc["type"],
+        "amount": doc["amount"],
+        "from_account_id": doc.get("from_account_id"),
+        "to_account_id": doc.get("to_account_id"),
+        "detail": doc["detail"],
+        "document_files": doc.get("document_files") or [],
+        "created_at": doc["created_at"],
+        "updated_at": doc["updated_at"],
+    }
+
+
+async def iter_batches(docs: AsyncIterator[dict], batch_size: int) -> AsyncIterator[List[dict]]:
+    batch = []
+    async for doc in docs:
+        batch.append(export_record(doc))
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def encode_csv(records: List[dict], include_header: bool) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if include_header:
+        writer.writerow(EXPORT_FIELDS)
+    for record in records:
+        writer.writerow([
+            ";".join(record["document_files"]) if field == "document_files"
+            else record[field].isoformat() if isinstance(record[field], datetime)
+            else record[field]
+            for field in EXPORT_FIELDS
+        ])
+    return buffer.getvalue().encode()
+
+
+def encode_ndjson(records: List[dict]) -> bytes:
+    return "".join(
+        json.dumps(record, default=datetime.isoformat) + "\n" for record in records
+    ).encode()
+
+
+class _ParquetSink:
+    """Write-only file object that hands written bytes back to the caller."""
+
+    def __init__(self):
+        self.closed = False
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def parquet_schema():
+    return pa.schema([
+        ("id", pa.string()),
+        ("transaction_date", pa.timestamp("ms")),
+        ("type", pa.string()),
+        ("amount", pa.float64()),
+        ("from_account_id", pa.string()),
+        ("to_account_id", pa.string()),
+        ("detail", pa.string()),
+        ("document_files", pa.list_(pa.string())),
+        ("created_at", pa.timestamp("ms")),
+        ("updated_at", pa.timestamp("ms")),
+    ])
+
+
+async def stream_export(docs: AsyncIterator[dict], export_format: str, batch_size: int) -> AsyncIterator[bytes]:
+    """
+    Encode documents as csv, ndjson or parquet. Encoding runs in a worker
+    thread one batch at a time; with parquet every batch is a row group.
+    """
+    if export_format == "parquet":
+        sink = _ParquetSink()
+        writer = pq.ParquetWriter(sink, parquet_schema())
+
+        def encode_parquet(records: List[dict]) -> bytes:
+            writer.write_table(pa.Table.from_pylist(records, schema=writer.schema))
+            return sink.drain()
+
+        try:
+            async for batch in iter_batches(docs, batch_size):
+                yield await anyio.to_thread.run_sync(encode_parquet, batch)
+        finally:
+            writer.close()
+        yield sink.drain()
+        return
+
+    include_header = True
+    async for batch in iter_batches(docs, batch_size):
+        if export_format == "csv":
+            yield await anyio.to_thread.run_sync(encode_csv, batch, include_header)
+            include_header = False
+        else:
+            yield await anyio.to_thread.run_sync(encode_ndjson, batch)
+    if export_format == "csv" and include_header:
+        yield encode_csv([], include_header=True)
+
+
+async def gzip_stream(chunks: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 writes a gzip header
+    async for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,271 @@
+import os
+import asyncio
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Set, Tuple
+import anyio
+from pymongo.errors import DuplicateKeyError
+from auth_utils import db, transactions_collection
+from file_store import (
+    BLOB_DIR,
+    TEMP_DIR,
+    TRASH_SUFFIX,
+    UPLOAD_DIR,
+    blobs_collection,
+    file_handles_collection,
+    release_files
+)
+
+# Attachment cleanup.
+#
+# Deleting or detaching files only queues them here; a background task
+# releases them so responses never wait on the filesystem. A periodic
+# sweeper collects what nothing references: uploads never attached to a
+# transaction, blobs and thumbnails left behind by a crash, abandoned temp
+# files, and anything the queue lost on shutdown. Only entries older than
+# ORPHAN_GRACE_HOURS are touched, so uploads still waiting for their
+# transaction to be saved are safe.
+
+FILE_CLEANUP_DRAIN_SECONDS = float(os.getenv("FILE_CLEANUP_DRAIN_SECONDS", "5"))
+ORPHAN_SWEEP_INTERVAL = float(os.getenv("ORPHAN_SWEEP_INTERVAL", "3600"))  # seconds, 0 disables
+ORPHAN_GRACE_HOURS = float(os.getenv("ORPHAN_GRACE_HOURS", "24"))
+ORPHAN_SWEEP_BATCH = int(os.getenv("ORPHAN_SWEEP_BATCH", "500"))
+
+# One worker process claims each sweep; the others skip it
+leases_collection = db.maintenance_leases
+SWEEP_LEASE_ID = "orphan_sweep"
+
+logger = logging.getLogger(__name__)
+
+_queue: Optional[asyncio.Queue] = None
+_tasks: list = []
+
+
+def enqueue_file_deletion(user_id: str, filenames: Iterable[str]) -> bool:
+    """
+    Queue the user's stored filenames for release without waiting. Returns
+    False if nothing was queued; files that miss the queue are left to the
+    sweeper.
+    """
+    filenames = [filename for filename in filenames if filename]
+    if not filenames:
+        return False
+    if _queue is None:
+        logger.warning(f"File cleanup is not running; {len(filenames)} file(s) left for the orphan sweeper")
+        return False
+    _queue.put_nowait((user_id, filenames))
+    return True
+
+
+async def _deletion_worker():
+    while True:
+        user_id, filenames = await _queue.get()
+        try:
+            result = await release_files(user_id, filenames)
+            if result["failed_files"]:
+                logger.warning(f"Failed to clean up some files: {result['failed_files']}")
+        except Exception as e:
+            logger.error(f"Error releasing files {filenames}: {e!r}")
+        finally:
+            _queue.task_done()
+
+
+def _iter_files(root: str) -> Iterator[Tuple[str, str, float]]:
+    """Yield (name, path, mtime) for every file under root, streaming directories with os.scandir."""
+    try:
+        with os.scandir(root) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        yield from _iter_files(entry.path)
+                    elif entry.is_file(follow_symlinks=False):
+                        yield entry.name, entry.path, entry.stat(follow_symlinks=False).st_mtime
+                except FileNotFoundError:
+                    continue  # removed while we were scanning
+    except FileNotFoundError:
+        return
+
+
+async def _file_batches(root: str, cutoff: datetime):
+    """Batches of files under root last modified before cutoff. Directory reads run in a thread."""
+    cutoff_ts = (cutoff - datetime(1970, 1, 1)).total_seconds()
+    files = _iter_files(root)
+    while True:
+        batch = await anyio.to_thread.run_sync(lambda: list(islice(files, ORPHAN_SWEEP_BATCH)))
+        if not batch:
+            return
+        old = [(name, path) for name, path, mtime in batch if mtime < cutoff_ts]
+        if old:
+            yield old
+
+
+async def _referenced_filenames(filenames: List[str]) -> Set[str]:
+    """The subset of filenames attached to any transaction (one query on the document_files index)."""
+    referenced = set()
+    cursor = transactions_collection.find(
+        {"document_files": {"$in": filenames}},
+        {"document_files": 1, "_id": 0}
+    )
+    async for transaction in cursor:
+        referenced.update(transaction.get("document_files", []))
+    return referenced.intersection(filenames)
+
+
+async def _unlink(paths: List[str], dry_run: bool) -> int:
+    if not dry_run:
+        for path in paths:
+            await anyio.Path(path).unlink(missing_ok=True)
+    return len(paths)
+
+
+async def _sweep_handles(cutoff: datetime, dry_run: bool) -> int:
+    """Release upload handles that no transaction references."""
+    released = 0
+    batch = {}
+
+    async def flush():
+        nonlocal released
+        referenced = await _referenced_filenames(list(batch))
+        orphans = defaultdict(list)
+        for filename, user_id in batch.items():
+            if filename not in referenced:
+                orphans[user_id].append(filename)
+        for user_id, filenames in orphans.items():
+            if not dry_run:
+                filenames = (await release_files(user_id, filenames))["deleted_files"]
+            released += len(filenames)
+        batch.clear()
+
+    cursor = file_handles_collection.find({"created_at": {"$lt": cutoff}}, {"_id": 1, "user_id": 1})
+    async for handle in cursor:
+        batch[handle["_id"]] = handle["user_id"]
+        if len(batch) >= ORPHAN_SWEEP_BATCH:
+            await flush()
+    if batch:
+        await flush()
+    return released
+
+
+async def _sweep_legacy_files(cutoff: datetime, dry_run: bool) -> int:
+    """Remove files in the legacy flat upload directory that no transaction references."""
+    removed = 0
+    async for batch in _file_batches(UPLOAD_DIR, cutoff):
+        referenced = await _referenced_filenames([name for name, _ in batch])
+        removed += await _unlink([path for name, path in batch if name not in referenced], dry_run)
+    return removed
+
+
+async def _sweep_blob_files(cutoff: datetime, dry_run: bool) -> int:
+    """
+    Remove blobs, thumbnails and partial renders whose blob has no
+    file_blobs entry, and blobs left mid-release (e.g. the process died
+    between moving a blob aside and deleting it).
+    """
+    removed = 0
+    async for batch in _file_batches(BLOB_DIR, cutoff):
+        # Blobs are named by hash; derived files add a suffix ("<hash>.thumb.webp")
+        hashes = {name: name.split(".", 1)[0] for name, _ in batch}
+        known = set()
+        cursor = blobs_collection.find({"_id": {"$in": list(set(hashes.values()))}}, {"_id": 1})
+        async for blob in cursor:
+            known.add(blob["_id"])
+        removed += await _unlink(
+            [
+                path for name, path in batch
+                if hashes[name] not in known or name.endswith((".part", TRASH_SUFFIX))
+            ],
+            dry_run
+        )
+    return removed
+
+
+async def _sweep_temp_files(cutoff: datetime, dry_run: bool) -> int:
+    """Remove upload temp files abandoned by an interrupted request."""
+    removed = 0
+    async for batch in _file_batches(TEMP_DIR, cutoff):
+        removed += await _unlink([path for _, path in batch], dry_run)
+    return removed
+
+
+async def sweep_orphans(grace_hours: float = ORPHAN_GRACE_HOURS, dry_run: bool = False) -> dict:
+    """
+    Remove unreferenced attachments older than grace_hours. Returns how many
+    of each kind were removed (or would be, with dry_run).
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    # Handles first, so blobs they release are gone before the disk scan
+    result = {
+        "handles": await _sweep_handles(cutoff, dry_run),
+        "legacy_files": await _sweep_legacy_files(cutoff, dry_run),
+        "blob_files": await _sweep_blob_files(cutoff, dry_run),
+        "temp_files": await _sweep_temp_files(cutoff, dry_run)
+    }
+    logger.info(f"Orphan sweep{' (dry run)' if dry_run else ''}: {result}")
+    return result
+
+
+async def _claim_sweep() -> bool:
+    """Take the sweep lease for this interval. False if another worker holds it."""
+    now = datetime.utcnow()
+    try:
+        await leases_collection.update_one(
+            {"_id": SWEEP_LEASE_ID, "expires_at": {"$lte": now}},
+            {"$set": {"expires_at": now + timedelta(seconds=ORPHAN_SWEEP_INTERVAL * 0.9), "pid": os.getpid()}},
+            upsert=True
+        )
+        return True
+    except DuplicateKeyError:
+        return False
+
+
+async def _sweeper():
+    while True:
+        await asyncio.sleep(ORPHAN_SWEEP_INTERVAL)
+        try:
+            if await _claim_sweep():
+                await sweep_orphans()
+        except Exception as e:
+            logger.error(f"Orphan sweep failed: {e!r}")
+
+
+async def start_file_cleanup():
+    global _queue, _tasks
+    _queue = asyncio.Queue()
+    _tasks = [asyncio.create_task(_deletion_worker())]
+    if ORPHAN_SWEEP_INTERVAL > 0:
+        _tasks.append(asyncio.create_task(_sweeper()))
+
+
+async def stop_file_cleanup():
+    """Give queued deletions a moment to finish; the sweeper collects the rest later."""
+    global _queue, _tasks
+    if _queue is not None:
+        try:
+            await asyncio.wait_for(_queue.join(), FILE_CLEANUP_DRAIN_SECONDS)
+        except asyncio.TimeoutError:
+            logger.warning(f"{_queue.qsize()} file deletion batch(es) left for the orphan sweeper")
+    for task in _tasks:
+        task.cancel()
+    await asyncio.gather(*_tasks, return_exceptions=True)
+    _queue, _tasks = None, []
+
+
+if __name__ == "__main__":
+    import argparse
+    from auth_utils import client
+
+    parser = argparse.ArgumentParser(description="Remove unreferenced attachments")
+    parser.add_argument("--grace-hours", type=float, default=ORPHAN_GRACE_HOURS)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    async def main():
+        try:
+            print(await sweep_orphans(args.grace_hours, args.dry_run))
+        finally:
+            await client.close()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
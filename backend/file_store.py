@@ -0,0 +1,223 @@
+import os
+import uuid
+import logging
+from datetime import datetime
+from typing import List, Optional
+import anyio
+from pymongo import ReturnDocument
+from auth_utils import db
+from thumbnails import THUMBNAIL_SUFFIX
+
+# Content-addressed storage for transaction attachments.
+#
+# Each upload gets its own handle (the stored filename clients see, e.g.
+# "{user_id}_{uuid}_{name}") in transaction_files, pointing at a blob keyed
+# by the SHA-256 of its content. Blobs live under uploads/blobs/ab/cd/<sha256>
+# so no single directory grows unbounded, and file_blobs keeps a refcount of
+# handles per blob so identical uploads are stored once.
+
+UPLOAD_DIR = "uploads/transaction_documents"  # Legacy flat layout (pre content-addressing)
+BLOB_DIR = "uploads/blobs"
+TEMP_DIR = "uploads/tmp"
+TRASH_SUFFIX = ".deleting"  # blobs being released, see release_blob
+
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(BLOB_DIR, exist_ok=True)
+os.makedirs(TEMP_DIR, exist_ok=True)
+
+blobs_collection = db.file_blobs
+file_handles_collection = db.transaction_files
+
+logger = logging.getLogger(__name__)
+
+
+def blob_path(content_hash: str) -> str:
+    return os.path.join(BLOB_DIR, content_hash[:2], content_hash[2:4], content_hash)
+
+
+def thumbnail_path(content_hash: str) -> str:
+    """Thumbnails are derived from the blob, so they're stored right next to it."""
+    return blob_path(content_hash) + THUMBNAIL_SUFFIX
+
+
+async def store_blob(temp_path: str, content_hash: str, size: int) -> str:
+    """
+    Take ownership of a fully written temp file as the blob for content_hash,
+    incrementing its refcount. If the blob already exists the temp file is
+    discarded. The caller must hand the reference to a handle with
+    create_file_handle. Returns the blob path.
+    """
+    path = blob_path(content_hash)
+    result = await blobs_collection.update_one(
+        {"_id": content_hash},
+        {
+            "$inc": {"refcount": 1},
+            "$setOnInsert": {"size": size, "created_at": datetime.utcnow()}
+        },
+        upsert=True
+    )
+
+    try:
+        if result.upserted_id is not None or not await anyio.Path(path).exists():
+            await anyio.Path(path).parent.mkdir(parents=True, exist_ok=True)
+            await anyio.Path(temp_path).replace(path)
+        else:
+            await anyio.Path(temp_path).unlink(missing_ok=True)
+    except BaseException:
+        await release_blob(content_hash)
+        raise
+    return path
+
+
+async def create_file_handle(
+    stored_filename: str,
+    user_id: str,
+    content_hash: str,
+    size: int,
+    original_filename: str,
+    content_type: Optional[str]
+):
+    """
+    Store the handle for a blob just stored with store_blob, taking over the
+    reference it added. If the handle can't be stored the reference is
+    dropped again, so the blob doesn't outlive every handle.
+    """
+    try:
+        await file_handles_collection.insert_one({
+            "_id": stored_filename,
+            "user_id": user_id,
+            "sha256": content_hash,
+            "size": size,
+            "original_filename": original_filename,
+            "content_type": content_type,
+            "created_at": datetime.utcnow()
+        })
+    except BaseException:
+        await release_blob(content_hash)
+        raise
+
+
+async def get_file_handle(stored_filename: str) -> Optional[dict]:
+    return await file_handles_collection.find_one({"_id": stored_filename})
+
+
+async def resolve_file(stored_filename: str) -> Optional[dict]:
+    """
+    Look up a stored filename. Returns {"path", "sha256", "last_modified"}
+    or None if the file doesn't exist. Legacy flat files have no sha256.
+    """
+    handle = await get_file_handle(stored_filename)
+    if handle:
+        path = anyio.Path(blob_path(handle["sha256"]))
+        if not await path.exists():
+            return None
+        return {
+            "path": str(path),
+            "sha256": handle["sha256"],
+            "last_modified": handle["created_at"]
+        }
+
+    path = anyio.Path(os.path.join(UPLOAD_DIR, stored_filename))
+    if not await path.exists():
+        return None
+    stat_result = await path.stat()
+    return {
+        "path": str(path),
+        "sha256": None,
+        "last_modified": datetime.utcfromtimestamp(stat_result.st_mtime)
+    }
+
+
+async def release_blob(content_hash: str) -> bool:
+    """
+    Drop one reference to a blob, removing it from disk when no handles are
+    left. Returns True if the blob itself was deleted.
+    """
+    blob = await blobs_collection.find_one_and_update(
+        {"_id": content_hash},
+        {"$inc": {"refcount": -1}},
+        return_document=ReturnDocument.AFTER
+    )
+    if blob is None or blob["refcount"] > 0:
+        return False
+
+    # Move the file aside before dropping the entry: once the entry is gone a
+    # new upload of the same content may store a fresh file at this path,
+    # which a late unlink would take with it
+    path = anyio.Path(blob_path(content_hash))
+    trash = anyio.Path(f"{path}.{uuid.uuid4().hex}{TRASH_SUFFIX}")
+    try:
+        await path.rename(trash)
+    except FileNotFoundError:
+        trash = None
+
+    result = await blobs_collection.delete_one({"_id": content_hash, "refcount": {"$lte": 0}})
+    if result.deleted_count:
+        if trash is not None:
+            await trash.unlink(missing_ok=True)
+        await anyio.Path(thumbnail_path(content_hash)).unlink(missing_ok=True)
+        return True
+
+    # Re-referenced meanwhile: put the file back unless the new upload
+    # already stored its own copy (same content either way)
+    if trash is not None:
+        try:
+            await path.hardlink_to(trash)
+        except (FileExistsError, FileNotFoundError):
+            pass
+        await trash.unlink(missing_ok=True)
+    return False
+
+
+def is_legacy_file_of(filename: str, user_id: str) -> bool:
+    """Whether filename is a plain name in the legacy directory owned by user_id."""
+    return (
+        filename.startswith(f"{user_id}_")
+        and "/" not in filename
+        and "\\" not in filename
+        and os.path.basename(filename) == filename
+    )
+
+
+async def release_files(user_id: str, filenames: List[str]) -> dict:
+    """
+    Delete the user's file handles, releasing their blobs (refcount-aware).
+    Files from the legacy flat layout are removed directly. Names the user
+    doesn't own are skipped.
+    Returns a dictionary with deletion results.
+    """
+    deleted_files = []
+    failed_files = []
+
+    for filename in filenames:
+        if not filename:
+            continue
+        try:
+            handle = await file_handles_collection.find_one_and_delete({"_id": filename, "user_id": user_id})
+            if handle:
+                await release_blob(handle["sha256"])
+                deleted_files.append(filename)
+                logger.info(f"Released file: {filename}")
+                continue
+
+            if not is_legacy_file_of(filename, user_id):
+                logger.warning(f"Not releasing {filename}: not a file of user {user_id}")
+                failed_files.append(f"{filename} (not found)")
+                continue
+
+            legacy_path = anyio.Path(os.path.join(UPLOAD_DIR, filename))
+            if await legacy_path.exists():
+                await legacy_path.unlink()
+                deleted_files.append(filename)
+                logger.info(f"Deleted file: {filename}")
+            else:
+                logger.warning(f"File not found for deletion: {filename}")
+                failed_files.append(f"{filename} (not found)")
+        except Exception as file_error:
+            logger.error(f"Error deleting file {filename}: {str(file_error)}")
+            failed_files.append(f"{filename} (deletion error)")
+
+    return {
+        "deleted_files": deleted_files,
+        "failed_files": failed_files
+    }
@@ -0,0 +1,226 @@
+import csv
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from models import TransactionCreate, TransactionType
+
+# Streaming parsers for bank statement imports (CSV and OFX).
+#
+# Parsers are plain generators over a file on disk, so a statement of any
+# size is read with bounded memory. Each yields (row_number, record) where
+# record uses the canonical keys below; build_transaction turns a record
+# into a validated TransactionCreate.
+
+IMPORT_FORMATS = ("csv", "ofx")
+
+# Header aliases accepted in CSV files (matched case-insensitively)
+CSV_COLUMN_ALIASES = {
+    "date": "date",
+    "transaction_date": "date",
+    "posted": "date",
+    "amount": "amount",
+    "detail": "detail",
+    "description": "detail",
+    "memo": "detail",
+    "payee": "detail",
+    "type": "type",
+    "from_account_id": "from_account_id",
+    "to_account_id": "to_account_id",
+    "account": "account",
+    "account_id": "account",
+}
+
+OFX_TAG_PATTERN = re.compile(r"<(/?)([A-Za-z0-9.]+)>([^<]*)")
+OFX_READ_SIZE = 64 * 1024
+
+
+def iter_csv_records(path: str) -> Iterator[Tuple[int, dict]]:
+    with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header:
+            return
+        columns = [CSV_COLUMN_ALIASES.get(name.strip().lower()) for name in header]
+        if "date" not in columns or "amount" not in columns:
+            raise ValueError("CSV header must include date and amount columns")
+
+        for row_number, row in enumerate(reader, start=2):
+            if not any(row):
+                continue
+            yield row_number, {
+                key: value.strip()
+                for key, value in zip(columns, row)
+                if key and value.strip()
+            }
+
+
+def iter_ofx_records(path: str) -> Iterator[Tuple[int, dict]]:
+    """
+    Yield one record per <STMTTRN> block. Handles both SGML (unclosed
+    leaf tags) and XML flavours of OFX; the row number is the
+    transaction's position in the statement.
+    """
+    row_number = 0
+    current: Optional[dict] = None
+    with open(path, encoding="utf-8", errors="replace") as f:
+        pending = ""
+        while True:
+            chunk = f.read(OFX_READ_SIZE)
+            text = pending + chunk
+            # A leaf value runs up to the next tag, so hold back everything
+            # from the last "<" until more of the file has been read
+            cut = max(text.rfind("<"), 0) if chunk else len(text)
+            text, pending = text[:cut], text[cut:]
+
+            for closing, tag, value in OFX_TAG_PATTERN.findall(text):
+                tag = tag.upper()
+                if tag == "STMTTRN":
+                    if closing and current is not None:
+                        row_number += 1
+                        yield row_number, current
+                        current = None
+                    elif not closing:
+                        current = {}
+                elif current is not None and not closing and value.strip():
+                    current[tag] = value.strip()
+
+            if not chunk:
+                break
+
+
+def normalize_ofx_record(record: dict) -> dict:
+    detail = record.get("NAME") or record.get("MEMO") or record.get("PAYEE")
+    if record.get("NAME") and record.get("MEMO"):
+        detail = f"{record['NAME']} - {record['MEMO']}"
+    return {
+        "date": parse_ofx_date(record["DTPOSTED"]) if record.get("DTPOSTED") else None,
+        "amount": record.get("TRNAMT"),
+        "detail": detail,
+    }
+
+
+def parse_ofx_date(value: str) -> datetime:
+    # YYYYMMDD[HHMMSS[.XXX]][[+-]TZ[:name]]; the timezone suffix is ignored
+    match = re.match(r"\d{8,}", value)
+    if not match:
+        raise ValueError(f"Invalid date: {value}")
+    digits = match.group()
+    if len(digits) >= 14:
+        return datetime.strptime(digits[:14], "%Y%m%d%H%M%S")
+    return datetime.strptime(digits[:8], "%Y%m%d")
+
+
+def parse_date(value: str, date_format: Optional[str]) -> datetime:
+    if date_format:
+        return datetime.strptime(value, date_format)
+    return datetime.fromisoformat(value)
+
+
+def parse_amount(value: str) -> Decimal:
+    cleaned = value.replace(",", "").replace(" ", "")
+    if cleaned.startswith("(") and cleaned.endswith(")"):
+        cleaned = "-" + cleaned[1:-1]
+    try:
+        return Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {value}")
+
+
+def build_transaction(
+    record: dict,
+    accounts: Dict[str, str],
+    default_account_id: Optional[str],
+    date_format: Optional[str]
+) -> TransactionCreate:
+    """
+    Validate one parsed record. `accounts` maps both account ids and
+    lower-cased account names to ids for the importing user. When the
+    record has no type, the sign of the amount decides it: negative is an
+    outflow from the statement's account, positive an inflow to it.
+    """
+    if not record.get("amount"):
+        raise ValueError("Amount is required")
+    if not record.get("date"):
+        raise ValueError("Date is required")
+
+    amount = parse_amount(record["amount"])
+    date = record["date"]
+    if isinstance(date, str):
+        try:
+            date = parse_date(date, date_format)
+        except ValueError:
+            raise ValueError(f"Invalid date: {record['date']}")
+
+    def lookup(value: Optional[str]) -> Optional[str]:
+        if not value:
+            return None
+        account_id = accounts.get(value) or accounts.get(value.lower())
+        if not account_id:
+            raise ValueError(f"Account {value} not found or does not belong to user")
+        return account_id
+
+    account_id = lookup(record.get("account")) or default_account_id
+    from_account_id = lookup(record.get("from_account_id"))
+    to_account_id = lookup(record.get("to_account_id"))
+
+    if record.get("type"):
+        transaction_type = TransactionType(record["type"].capitalize())
+    else:
+        transaction_type = TransactionType.OUTFLOW if amount < 0 else TransactionType.INFLOW
+
+    if transaction_type == TransactionType.OUTFLOW:
+        from_account_id = from_account_id or account_id
+    else:
+        to_account_id = to_account_id or account_id
+
+    fields = {
+        "type": transaction_type,
+        "amount": float(abs(amount)),
+        "detail": record.get("detail") or "Imported transaction",
+        "transaction_date": date
+    }
+    # Only pass accounts that are set, as a JSON request body would
+    if from_account_id:
+        fields["from_account_id"] = from_account_id
+    if to_account_id:
+        fields["to_account_id"] = to_account_id
+    try:
+        return TransactionCreate(**fields)
+    except ValidationError as e:
+        raise ValueError("; ".join(error["msg"] for error in e.errors()))
+
+
+def iter_import_batches(
+    path: str,
+    file_format: str,
+    accounts: Dict[str, str],
+    default_account_id: Optional[str],
+    date_format: Optional[str],
+    batch_size: int
+) -> Iterator[Tuple[List[Tuple[int, TransactionCreate]], List[dict]]]:
+    """
+    Parse a statement file, yielding (valid, errors) per batch of
+    `batch_size` rows: valid is a list of (row_number, TransactionCreate),
+    errors a list of {"row", "error"}.
+    """
+    if file_format == "ofx":
+        records, to_record = iter_ofx_records(path), normalize_ofx_record
+    else:
+        records, to_record = iter_csv_records(path), dict
+
+    valid, errors = [], []
+    for row_number, record in records:
+        try:
+            record = to_record(record)
+            valid.append((row_number, build_transaction(record, accounts, default_account_id, date_format)))
+        except ValueError as e:
+            errors.append({"row": row_number, "error": str(e)})
+
+        if len(valid) + len(errors) >= batch_size:
+            yield valid, errors
+            valid, errors = [], []
+
+    if valid or errors:
+        yield valid, errors
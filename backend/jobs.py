@@ -0,0 +1,180 @@
+import os
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from auth_utils import db
+
+# Background jobs for work too long to hold a request open (e.g. deleting an
+# account together with its transactions).
+#
+# A job is a document in the jobs collection that clients poll through
+# GET /jobs/{id}. The process that creates a job runs it as an asyncio task
+# and the handler reports progress, which also refreshes heartbeat_at. If
+# that process dies or restarts, the heartbeat goes stale and another worker
+# picks the job up and runs the handler again, so handlers must be safe to
+# resume part way through.
+
+jobs_collection = db.jobs
+
+JOB_STALE_SECONDS = float(os.getenv("JOB_STALE_SECONDS", "120"))
+JOB_RESUME_INTERVAL = float(os.getenv("JOB_RESUME_INTERVAL", "60"))
+
+# handler(job, progress) -> result dict; await progress(n) after each n items
+JobHandler = Callable[[dict, Callable[[int], Awaitable[None]]], Awaitable[Optional[dict]]]
+
+logger = logging.getLogger(__name__)
+
+_handlers: Dict[str, JobHandler] = {}
+_running: set = set()
+_resumer: Optional[asyncio.Task] = None
+
+
+def job_handler(kind: str):
+    """Register the function that runs jobs of this kind."""
+    def register(func: JobHandler) -> JobHandler:
+        _handlers[kind] = func
+        return func
+    return register
+
+
+def serialize_job(job: dict) -> dict:
+    return {
+        "id": str(job["_id"]),
+        "kind": job["kind"],
+        "status": job["status"],
+        "processed": job.get("processed", 0),
+        "total": job.get("total"),
+        "result": job.get("result"),
+        "error": job.get("error"),
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "finished_at": job.get("finished_at")
+    }
+
+
+async def create_job(
+    user_id: str,
+    kind: str,
+    params: dict,
+    total: Optional[int] = None,
+    start: bool = True
+) -> dict:
+    """
+    Store a pending job and start running it in this process. With
+    start=False the caller starts it with start_job once it's ready; a job
+    never started is picked up when its heartbeat goes stale.
+    """
+    now = datetime.utcnow()
+    job = {
+        "user_id": user_id,
+        "kind": kind,
+        "params": params,
+        "status": "pending",
+        "processed": 0,
+        "total": total,
+        "attempts": 0,
+        "created_at": now,
+        "updated_at": now,
+        "heartbeat_at": now
+    }
+    await jobs_collection.insert_one(job)
+    if start:
+        start_job(job["_id"])
+    return job
+
+
+async def get_job(job_id: ObjectId, user_id: str) -> Optional[dict]:
+    return await jobs_collection.find_one({"_id": job_id, "user_id": user_id})
+
+
+def start_job(job_id: ObjectId):
+    task = asyncio.create_task(_run_job(job_id))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+
+
+async def _claim_job(job_id: ObjectId) -> Optional[dict]:
+    """Mark a job as running here, unless another worker is already running it."""
+    now = datetime.utcnow()
+    return await jobs_collection.find_one_and_update(
+        {
+            "_id": job_id,
+            "$or": [
+                {"status": "pending"},
+                {"status": "running", "heartbeat_at": {"$lt": now - timedelta(seconds=JOB_STALE_SECONDS)}}
+            ]
+        },
+        {
+            "$set": {"status": "running", "heartbeat_at": now, "updated_at": now, "pid": os.getpid()},
+            "$inc": {"attempts": 1}
+        },
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _finish_job(job_id: ObjectId, status: str, **fields):
+    now = datetime.utcnow()
+    await jobs_collection.update_one(
+        {"_id": job_id},
+        {"$set": {"status": status, "updated_at": now, "finished_at": now, **fields}}
+    )
+
+
+async def _run_job(job_id: ObjectId):
+    job = await _claim_job(job_id)
+    if job is None:
+        return
+
+    async def progress(processed: int):
+        now = datetime.utcnow()
+        await jobs_collection.update_one(
+            {"_id": job_id},
+            {"$inc": {"processed": processed}, "$set": {"heartbeat_at": now, "updated_at": now}}
+        )
+
+    try:
+        handler = _handlers.get(job["kind"])
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {job['kind']}")
+        result = await handler(job, progress)
+    except asyncio.CancelledError:
+        # Shutting down: the job stays "running" and is resumed elsewhere
+        # once its heartbeat goes stale
+        raise
+    except Exception as e:
+        logger.error(f"Job {job_id} ({job['kind']}) failed: {e!r}")
+        await _finish_job(job_id, "failed", error=str(e))
+        return
+    await _finish_job(job_id, "completed", result=result)
+
+
+async def _resume_stale_jobs():
+    while True:
+        await asyncio.sleep(JOB_RESUME_INTERVAL)
+        try:
+            stale = datetime.utcnow() - timedelta(seconds=JOB_STALE_SECONDS)
+            cursor = jobs_collection.find(
+                {"status": {"$in": ["pending", "running"]}, "heartbeat_at": {"$lt": stale}},
+                {"_id": 1}
+            )
+            async for job in cursor:
+                start_job(job["_id"])
+        except Exception as e:
+            logger.error(f"Error resuming jobs: {e!r}")
+
+
+async def start_job_runner():
+    global _resumer
+    _resumer = asyncio.create_task(_resume_stale_jobs())
+
+
+async def stop_job_runner():
+    global _resumer
+    tasks = list(_running) + ([_resumer] if _resumer else [])
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    _resumer = None
@@ -1,25 +1,61 @@
 import os
-from fastapi import FastAPI
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from routes import auth, accounts, transactions  # Add transactions import
+from routes import auth, accounts, transactions, jobs  # Add transactions import
+from routes.transactions import transaction_count_cache
 from dotenv import load_dotenv
 import uvicorn
-import create_indexes
+from create_indexes import create_indexes
+from auth_utils import (
+    account_ids_cache,
+    auth_cache_stats,
+    client,
+    connect_database,
+    db,
+    password_executor,
+    token_cache,
+    user_cache,
+    warm_up
+)
+from metrics import CONTENT_TYPE, MetricsMiddleware, register_cache, render_metrics
+from file_cleanup import start_file_cleanup, stop_file_cleanup
+from jobs import start_job_runner, stop_job_runner
+from thumbnails import start_thumbnail_workers, stop_thumbnail_workers
 
 # Load environment variables
 load_dotenv()
 
-if os.getenv("CREATE_DB_INDEXES", "false").lower() == "true":
-    try:
-        create_indexes.create_indexes()
-        print("✅ Database indexes ensured.")
-    except Exception as e:
-        print(f"❌ Error ensuring database indexes: {e}")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await connect_database()
+    # Index builds can take a while on a large collection; don't hold up
+    # startup for them (create_index is a no-op for existing indexes)
+    index_task = None
+    if os.getenv("CREATE_DB_INDEXES", "false").lower() == "true":
+        index_task = asyncio.create_task(create_indexes(db))
+    await start_thumbnail_workers()
+    await start_file_cleanup()
+    await start_job_runner()
+    # Runs before this worker accepts connections, so under serve.py a new or
+    # restarted worker only joins the pool once it's warm
+    if os.getenv("WORKER_WARMUP", "true").lower() == "true":
+        await warm_up()
+    yield
+    if index_task and not index_task.done():
+        index_task.cancel()
+    await stop_job_runner()
+    await stop_thumbnail_workers()
+    await stop_file_cleanup()
+    password_executor.shutdown(wait=False)
+    await client.close()
 
 app = FastAPI(
     title="Finance Tracker API", 
     version="1.0.0",
-    description="A personal finance tracking application API"
+    description="A personal finance tracking application API",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -30,11 +66,18 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware)
+
+register_cache("users", user_cache.stats)
+register_cache("tokens", token_cache.stats)
+register_cache("account_ids", account_ids_cache.stats)
+register_cache("transaction_counts", transaction_count_cache.stats)
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(accounts.router)
 app.include_router(transactions.router)  # Add transactions router
+app.include_router(jobs.router)
 
 @app.get("/")
 async def root():
@@ -49,7 +92,20 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/health/caches")
+async def cache_stats():
+    return {
+        **auth_cache_stats(),
+        "transaction_counts": transaction_count_cache.stats()
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint (this worker's metrics only)."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
 if __name__ == "__main__":
+    # Development server with auto-reload; run serve.py in production
     uvicorn.run(
         "main:app",
         host="0.0.0.0", 
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+from auth_utils import transactions_collection
+
+# One-off data migrations. Run with: python migrations.py <name> [batch_size]
+
+
+async def backfill_account_ids(batch_size: int = 1000) -> int:
+    """
+    Populate account_ids on transactions written before the field existed.
+    Works through the collection in _id order, one bounded batch at a time.
+    Returns the number of transactions updated.
+    """
+    updated = 0
+    last_id = None
+    while True:
+        query = {"account_ids": {"$exists": False}}
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+
+        batch = await transactions_collection.find(query, {"_id": 1})\
+            .sort("_id", 1)\
+            .limit(batch_size)\
+            .to_list(None)
+        if not batch:
+            break
+
+        ids = [doc["_id"] for doc in batch]
+        result = await transactions_collection.update_many(
+            {"_id": {"$in": ids}},
+            [{"$set": {"account_ids": {"$setDifference": [
+                ["$from_account_id", "$to_account_id"],
+                [None, ""]
+            ]}}}]
+        )
+        updated += result.modified_count
+        last_id = ids[-1]
+        print(f"... {updated} transactions updated")
+
+    return updated
+
+
+MIGRATIONS = {
+    "backfill_account_ids": backfill_account_ids,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in MIGRATIONS:
+        print(f"Usage: python migrations.py <{'|'.join(MIGRATIONS)}> [batch_size]")
+        sys.exit(1)
+
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    count = asyncio.run(MIGRATIONS[sys.argv[1]](batch_size))
+    print(f"✅ {sys.argv[1]}: {count} document(s) updated")
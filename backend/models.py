@@ -1,8 +1,12 @@
+import os
 from pydantic import BaseModel, EmailStr, validator
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
 
+# Maximum number of transactions accepted by POST /transactions/multiple
+MAX_BULK_TRANSACTIONS = int(os.getenv("MAX_BULK_TRANSACTIONS", "500"))
+
 # Existing user models
 class UserSignUp(BaseModel):
     full_name: str
@@ -110,8 +114,8 @@ class MultipleTransactionsCreate(BaseModel):
     def validate_transactions_list(cls, v):
         if not v or len(v) == 0:
             raise ValueError('At least one transaction is required')
-        if len(v) > 50:  # Limit bulk creation to 50 transactions
-            raise ValueError('Maximum 50 transactions allowed per batch')
+        if len(v) > MAX_BULK_TRANSACTIONS:
+            raise ValueError(f'Maximum {MAX_BULK_TRANSACTIONS} transactions allowed per batch')
         return v
 
 class TransactionUpdate(BaseModel):
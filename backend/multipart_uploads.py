@@ -0,0 +1,180 @@
+import os
+import uuid
+import hashlib
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+import anyio
+from fastapi import Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+# Streaming multipart/form-data receiver for upload endpoints.
+#
+# Declaring UploadFile parameters makes Starlette spool the whole body to a
+# temporary file before the handler runs, so size limits can only be checked
+# afterwards and every upload is written twice. Endpoints that take files
+# read request.stream() through this instead: each file part goes straight
+# to its own temp file, hashed as it's written, and the request is abandoned
+# as soon as a part goes over the limit or its filename is rejected.
+
+# Bytes of non-file form fields we are willing to buffer (they're ignored)
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, filename: str):
+        super().__init__(filename)
+        self.filename = filename
+
+
+class InvalidUpload(Exception):
+    """The body isn't well-formed multipart/form-data."""
+
+
+@dataclass
+class ReceivedFile:
+    filename: str
+    content_type: Optional[str]
+    path: str
+    size: int
+    sha256: str
+
+
+class _Part:
+    def __init__(self):
+        self.headers = {}
+        self.field_name = None
+        self.filename = None
+        self.content_type = None
+        self.field_size = 0
+
+
+def _decode(value: bytes) -> str:
+    try:
+        return value.decode("utf-8")
+    except UnicodeDecodeError:
+        return value.decode("latin-1")
+
+
+async def receive_files(
+    request: Request,
+    field_name: str,
+    temp_dir: str,
+    max_size: int,
+    max_files: Optional[int] = None,
+    check_filename: Optional[Callable[[str], None]] = None
+) -> List[ReceivedFile]:
+    """
+    Stream the files posted under field_name to temp files in temp_dir.
+    check_filename runs as soon as a part's headers arrive and may raise to
+    reject the request before its data is read. Raises UploadTooLarge or
+    InvalidUpload; temp files are removed on any failure, otherwise the
+    caller owns them.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise InvalidUpload("Expected multipart/form-data")
+
+    # Parser callbacks are synchronous; they queue events that are then
+    # handled (with async file I/O) after each chunk is fed
+    events = []
+    part = _Part()
+    header_name = b""
+    header_value = b""
+    file_count = 0
+
+    def on_part_begin():
+        nonlocal part
+        part = _Part()
+
+    def on_header_field(data, start, end):
+        nonlocal header_name
+        header_name += data[start:end]
+
+    def on_header_value(data, start, end):
+        nonlocal header_value
+        header_value += data[start:end]
+
+    def on_header_end():
+        nonlocal header_name, header_value
+        part.headers[header_name.lower()] = header_value
+        header_name, header_value = b"", b""
+
+    def on_headers_finished():
+        nonlocal file_count
+        _, options = parse_options_header(part.headers.get(b"content-disposition", b""))
+        part.field_name = _decode(options.get(b"name", b""))
+        if part.field_name != field_name or b"filename" not in options:
+            return
+        part.filename = os.path.basename(_decode(options[b"filename"]))
+        content_type = part.headers.get(b"content-type")
+        part.content_type = _decode(content_type) if content_type else None
+        file_count += 1
+        if max_files is not None and file_count > max_files:
+            raise InvalidUpload(f"Too many files. Maximum number of files is {max_files}")
+        if check_filename:
+            check_filename(part.filename)
+        events.append(("begin", part))
+
+    def on_part_data(data, start, end):
+        if part.filename is not None:
+            events.append(("data", data[start:end]))
+        else:
+            part.field_size += end - start
+            if part.field_size > MAX_FIELD_SIZE:
+                raise InvalidUpload("Form field too large")
+
+    def on_part_end():
+        if part.filename is not None:
+            events.append(("end", part))
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end
+    })
+
+    received = []
+    current = None  # (part, path, file, digest, size)
+    try:
+        async for chunk in request.stream():
+            try:
+                parser.write(chunk)
+            except MultipartParseError as e:
+                raise InvalidUpload(str(e))
+            for event, value in events:
+                if event == "begin":
+                    path = os.path.join(temp_dir, uuid.uuid4().hex)
+                    current = [value, path, await anyio.open_file(path, "wb"), hashlib.sha256(), 0]
+                elif event == "data":
+                    current[4] += len(value)
+                    if current[4] > max_size:
+                        raise UploadTooLarge(current[0].filename)
+                    current[3].update(value)
+                    await current[2].write(value)
+                else:
+                    await current[2].aclose()
+                    received.append(ReceivedFile(
+                        filename=value.filename,
+                        content_type=value.content_type,
+                        path=current[1],
+                        size=current[4],
+                        sha256=current[3].hexdigest()
+                    ))
+                    current = None
+            events.clear()
+        parser.finalize()
+        if current is not None:
+            raise InvalidUpload("Upload ended in the middle of a file")
+    except BaseException:
+        if current is not None:
+            await current[2].aclose()
+            await anyio.Path(current[1]).unlink(missing_ok=True)
+        for received_file in received:
+            await anyio.Path(received_file.path).unlink(missing_ok=True)
+        raise
+    return received
@@ -0,0 +1,430 @@
+import os
+import asyncio
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from pymongo import UpdateOne
+from auth_utils import db, transactions_collection
+from balances import balance_deltas
+
+# Pre-aggregated transaction totals per (user_id, account_id, type, bucket).
+# Each transaction is counted in a day bucket and a month bucket, once with
+# account_id=None (user-wide totals) and once for the account whose balance
+# it moves: an Inflow for its to_account, an Outflow for its from_account
+# (the rules in balances.py, so per-account series agree with balances).
+rollups_collection = db.transaction_rollups
+
+ROLLUP_KEY = [("user_id", 1), ("account_id", 1), ("granularity", 1), ("bucket", 1), ("type", 1)]
+
+# rebuild_rollups upserts buckets in batches of this many
+REBUILD_BATCH_SIZE = int(os.getenv("ROLLUP_REBUILD_BATCH_SIZE", "1000"))
+
+
+def account_side_filter(account_id: str) -> dict:
+    """Match the transactions that count towards account_id's rollups."""
+    return {"$or": [
+        {"type": "Inflow", "to_account_id": account_id},
+        {"type": "Outflow", "from_account_id": account_id}
+    ]}
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    # Mongo stores UTC; compare and bucket on naive UTC datetimes
+    if value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def day_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, value.day)
+
+
+def month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1)
+
+
+def next_month(value: datetime) -> datetime:
+    if value.month == 12:
+        return datetime(value.year + 1, 1, 1)
+    return datetime(value.year, value.month + 1, 1)
+
+
+def rollup_keys(transaction_doc: dict) -> list:
+    """Return the (account_id, granularity, bucket, type) keys a transaction counts towards."""
+    transaction_date = to_utc_naive(transaction_doc["transaction_date"])
+
+    keys = []
+    for account_id in [None] + list(balance_deltas(transaction_doc)):
+        keys.append((account_id, "day", day_start(transaction_date), transaction_doc["type"]))
+        keys.append((account_id, "month", month_start(transaction_date), transaction_doc["type"]))
+    return keys
+
+
+async def apply_rollup_changes(
+    user_id: str,
+    old_docs: Optional[list] = None,
+    new_docs: Optional[list] = None
+):
+    """
+    Remove old_docs from and add new_docs to the rollup buckets, in a single
+    bulk write of $inc upserts.
+    """
+    totals = defaultdict(lambda: [0, 0])
+    for sign, docs in ((-1, old_docs), (1, new_docs)):
+        for doc in docs or []:
+            for key in rollup_keys(doc):
+                totals[key][0] += sign * doc.get("amount", 0)
+                totals[key][1] += sign
+
+    operations = []
+    for (account_id, granularity, bucket, transaction_type), (amount, count) in totals.items():
+        if not amount and not count:
+            continue
+        operations.append(UpdateOne(
+            {
+                "user_id": user_id,
+                "account_id": account_id,
+                "granularity": granularity,
+                "bucket": bucket,
+                "type": transaction_type
+            },
+            {
+                "$inc": {"total_amount": amount, "count": count},
+                # Newer than any rebuild in progress, so it won't prune the row
+                "$setOnInsert": {"rebuilt_at": datetime.utcnow()}
+            },
+            upsert=True
+        ))
+
+    if operations:
+        await rollups_collection.bulk_write(operations, ordered=False)
+
+
+async def summarize_range(
+    user_id: str,
+    account_id: Optional[str],
+    start_date: Optional[datetime],
+    end_date: Optional[datetime]
+) -> dict:
+    """
+    Return {type: {"total_amount", "count"}} for transactions with
+    start_date <= transaction_date <= end_date. Whole months and whole days
+    are read from the rollups; only the partial days at either edge of the
+    range are aggregated from raw transactions.
+    """
+    start_date = to_utc_naive(start_date) if start_date else None
+    end_date = to_utc_naive(end_date) if end_date else None
+
+    # Whole days inside the range: [first_day, last_day)
+    first_day = None
+    if start_date:
+        first_day = day_start(start_date)
+        if first_day < start_date:
+            first_day += timedelta(days=1)
+    last_day = day_start(end_date) if end_date else None
+
+    bucket_filters = []
+    raw_ranges = []
+    if first_day and last_day and first_day >= last_day:
+        # Range is within a day or two; just aggregate the raw rows
+        raw_ranges.append((start_date, end_date, True))
+    else:
+        if start_date and start_date < first_day:
+            raw_ranges.append((start_date, first_day, False))
+        if end_date:
+            raw_ranges.append((last_day, end_date, True))
+
+        # Whole months inside [first_day, last_day), day buckets for the rest
+        first_month = None
+        if first_day:
+            first_month = first_day if first_day.day == 1 else next_month(first_day)
+        last_month = month_start(last_day) if last_day else None
+
+        if first_month is None or last_month is None or first_month < last_month:
+            month_range = {}
+            if first_month:
+                month_range["$gte"] = first_month
+            if last_month:
+                month_range["$lt"] = last_month
+            bucket_filters.append({"granularity": "month", **({"bucket": month_range} if month_range else {})})
+            if first_day and first_day < first_month:
+                bucket_filters.append({"granularity": "day", "bucket": {"$gte": first_day, "$lt": first_month}})
+            if last_day and last_month < last_day:
+                bucket_filters.append({"granularity": "day", "bucket": {"$gte": last_month, "$lt": last_day}})
+        else:
+            bucket_filters.append({"granularity": "day", "bucket": {"$gte": first_day, "$lt": last_day}})
+
+    summary = defaultdict(lambda: {"total_amount": 0, "count": 0})
+
+    if bucket_filters:
+        pipeline = [
+            {"$match": {"user_id": user_id, "account_id": account_id, "$or": bucket_filters}},
+            {"$group": {"_id": "$type", "total_amount": {"$sum": "$total_amount"}, "count": {"$sum": "$count"}}}
+        ]
+        cursor = await rollups_collection.aggregate(pipeline)
+        async for result in cursor:
+            summary[result["_id"]]["total_amount"] += result["total_amount"]
+            summary[result["_id"]]["count"] += result["count"]
+
+    if raw_ranges:
+        date_filters = []
+        for range_start, range_end, inclusive_end in raw_ranges:
+            date_filters.append({"transaction_date": {
+                "$gte": range_start,
+                ("$lte" if inclusive_end else "$lt"): range_end
+            }})
+        query = {"user_id": user_id, "$or": date_filters}
+        if account_id:
+            query["$and"] = [account_side_filter(account_id)]
+        pipeline = [
+            {"$match": query},
+            {"$group": {"_id": "$type", "total_amount": {"$sum": "$amount"}, "count": {"$sum": 1}}}
+        ]
+        cursor = await transactions_collection.aggregate(pipeline)
+        async for result in cursor:
+            summary[result["_id"]]["total_amount"] += result["total_amount"]
+            summary[result["_id"]]["count"] += result["count"]
+
+    return dict(summary)
+
+
+def interval_start(value: datetime, interval: str) -> datetime:
+    """Truncate a datetime to the start of its day, ISO week (Monday) or month."""
+    if interval == "month":
+        return month_start(value)
+    day = day_start(value)
+    if interval == "week":
+        return day - timedelta(days=day.weekday())
+    return day
+
+
+def next_interval(value: datetime, interval: str) -> datetime:
+    if interval == "month":
+        return next_month(value)
+    return value + timedelta(days=7 if interval == "week" else 1)
+
+
+def intervals_before(value: datetime, interval: str, count: int) -> datetime:
+    """The interval start count intervals before value (itself an interval start)."""
+    if interval == "month":
+        months = value.year * 12 + value.month - 1 - count
+        return datetime(months // 12, months % 12 + 1, 1)
+    return value - timedelta(days=count * (7 if interval == "week" else 1))
+
+
+async def build_timeseries(
+    user_id: str,
+    interval: str,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    account_id: Optional[str] = None,
+    group_by_account: bool = False,
+    max_points: int = 1000
+) -> dict:
+    """
+    Bucketed inflow/outflow with a running balance, computed in one streaming
+    pass over the rollups sorted by bucket. Buckets before start_date only
+    contribute to the opening balance; whole months before the range are read
+    as month rollups so the pass stays proportional to the number of buckets.
+    Without start_date the series starts at the first transaction, but
+    covers at most the last max_points buckets; older history goes into the
+    opening balance. An explicit range longer than max_points raises
+    ValueError.
+    Returns columnar arrays aligned with "buckets".
+    """
+    end_key = interval_start(to_utc_naive(end_date) if end_date else datetime.utcnow(), interval)
+    if start_date:
+        start_key = interval_start(to_utc_naive(start_date), interval)
+        first_key = start_key
+    else:
+        start_key = intervals_before(end_key, interval, max_points - 1)
+        first_key = None
+
+    query = {"user_id": user_id}
+    if group_by_account:
+        query["account_id"] = {"$ne": None}
+    else:
+        query["account_id"] = account_id
+
+    end_bound = next_interval(end_key, interval)
+    if interval == "month":
+        query["granularity"] = "month"
+        query["bucket"] = {"$lt": end_bound}
+    else:
+        # Month rollups for full months before the range, day rollups after
+        split = month_start(start_key)
+        query["$or"] = [
+            {"granularity": "month", "bucket": {"$lt": split}},
+            {"granularity": "day", "bucket": {"$gte": split, "$lt": end_bound}}
+        ]
+
+    projection = {"_id": 0, "account_id": 1, "bucket": 1, "type": 1, "total_amount": 1, "count": 1}
+    opening = defaultdict(float)
+    points = defaultdict(lambda: defaultdict(lambda: [0.0, 0.0, 0, 0]))
+
+    cursor = rollups_collection.find(query, projection).sort("bucket", 1)
+    async for doc in cursor:
+        series_key = doc["account_id"]
+        is_inflow = doc["type"] == "Inflow"
+        key = interval_start(doc["bucket"], interval)
+        if key < start_key:
+            opening[series_key] += doc["total_amount"] if is_inflow else -doc["total_amount"]
+            continue
+        if first_key is None or key < first_key:
+            first_key = key
+        point = points[series_key][key]
+        if is_inflow:
+            point[0] += doc["total_amount"]
+            point[2] += doc["count"]
+        else:
+            point[1] += doc["total_amount"]
+            point[3] += doc["count"]
+    if opening and not start_date:
+        # History is older than the default window: show the whole window
+        first_key = start_key
+
+    buckets = []
+    key = first_key
+    while key is not None and key <= end_key:
+        buckets.append(key)
+        if len(buckets) > max_points:
+            raise ValueError(f"Too many points; narrow the date range or use a larger interval (max {max_points})")
+        key = next_interval(key, interval)
+
+    series_keys = sorted(set(points) | set(opening), key=lambda k: k or "")
+    if not series_keys and not group_by_account:
+        series_keys = [account_id]
+
+    series = []
+    for series_key in series_keys:
+        inflow, outflow, net, running, inflow_count, outflow_count = [], [], [], [], [], []
+        balance = opening.get(series_key, 0.0)
+        for bucket in buckets:
+            point = points[series_key].get(bucket, (0.0, 0.0, 0, 0))
+            balance += point[0] - point[1]
+            inflow.append(round(point[0], 2))
+            outflow.append(round(point[1], 2))
+            net.append(round(point[0] - point[1], 2))
+            running.append(round(balance, 2))
+            inflow_count.append(point[2])
+            outflow_count.append(point[3])
+        series.append({
+            "account_id": series_key,
+            "opening_balance": round(opening.get(series_key, 0.0), 2),
+            "inflow": inflow,
+            "outflow": outflow,
+            "net": net,
+            "running_balance": running,
+            "inflow_count": inflow_count,
+            "outflow_count": outflow_count
+        })
+
+    return {"interval": interval, "buckets": buckets, "series": series}
+
+
+async def rebuild_rollups(user_id: Optional[str] = None):
+    """
+    Rebuild rollups from the transactions collection (backfill / repair).
+    Day totals per account side are aggregated server-side, one user at a
+    time; the user-wide and month buckets are summed from them and
+    everything is upserted in batches. Every rebuilt row is stamped with
+    rebuilt_at and rows older than the rebuild are only deleted once all of
+    them are written, so the summary never reads an empty collection. Run
+    while writes are quiet.
+    """
+    await rollups_collection.create_index(ROLLUP_KEY, unique=True)
+
+    match = {"user_id": user_id} if user_id else {}
+    rebuilt_at = datetime.utcnow()
+    operations = []
+
+    async def upsert(key: tuple, total_amount: float, count: int):
+        nonlocal operations
+        row_user_id, account_id, granularity, bucket, transaction_type = key
+        operations.append(UpdateOne(
+            {
+                "user_id": row_user_id,
+                "account_id": account_id,
+                "granularity": granularity,
+                "bucket": bucket,
+                "type": transaction_type
+            },
+            {"$set": {"total_amount": total_amount, "count": count, "rebuilt_at": rebuilt_at}},
+            upsert=True
+        ))
+        if len(operations) >= REBUILD_BATCH_SIZE:
+            await rollups_collection.bulk_write(operations, ordered=False)
+            operations = []
+
+    # The account whose balance moves, as in balance_deltas (None if unset)
+    side = {"$cond": [{"$eq": ["$type", "Inflow"]}, "$to_account_id", "$from_account_id"]}
+    pipeline = [
+        {"$match": match},
+        {"$group": {
+            "_id": {
+                "user_id": "$user_id",
+                "account_id": {"$ifNull": [side, None]},
+                # Truncate to the UTC day without $dateTrunc (MongoDB 5.0+)
+                "bucket": {"$dateFromParts": {
+                    "year": {"$year": "$transaction_date"},
+                    "month": {"$month": "$transaction_date"},
+                    "day": {"$dayOfMonth": "$transaction_date"}
+                }},
+                "type": "$type"
+            },
+            "total_amount": {"$sum": "$amount"},
+            "count": {"$sum": 1}
+        }},
+        {"$sort": {"_id.user_id": 1}}
+    ]
+
+    # One user's user-wide day buckets and all of their month buckets
+    derived = defaultdict(lambda: [0, 0])
+    current_user = None
+
+    async def flush_user():
+        for key, (total_amount, count) in derived.items():
+            await upsert(key, total_amount, count)
+        derived.clear()
+
+    cursor = await transactions_collection.aggregate(pipeline, allowDiskUse=True)
+    async for row in cursor:
+        key = row["_id"]
+        if key["user_id"] != current_user:
+            await flush_user()
+            current_user = key["user_id"]
+        month = month_start(key["bucket"])
+        derived_keys = [
+            (current_user, None, "day", key["bucket"], key["type"]),
+            (current_user, None, "month", month, key["type"])
+        ]
+        if key["account_id"]:
+            await upsert(
+                (current_user, key["account_id"], "day", key["bucket"], key["type"]),
+                row["total_amount"],
+                row["count"]
+            )
+            derived_keys.append((current_user, key["account_id"], "month", month, key["type"]))
+        for derived_key in derived_keys:
+            derived[derived_key][0] += row["total_amount"]
+            derived[derived_key][1] += row["count"]
+    await flush_user()
+    if operations:
+        await rollups_collection.bulk_write(operations, ordered=False)
+
+    # Buckets that no longer have any transactions. Rows apply_rollup_changes
+    # created during the rebuild are stamped later and kept.
+    await rollups_collection.delete_many({
+        **match,
+        "$or": [{"rebuilt_at": {"$lt": rebuilt_at}}, {"rebuilt_at": {"$exists": False}}]
+    })
+
+    return await rollups_collection.count_documents(match)
+
+
+if __name__ == "__main__":
+    import sys
+
+    target_user = sys.argv[1] if len(sys.argv) > 1 else None
+    count = asyncio.run(rebuild_rollups(target_user))
+    print(f"✅ Rebuilt {count} rollup bucket(s)")
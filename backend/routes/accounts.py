@@ -1,12 +1,131 @@
-from fastapi import APIRouter, HTTPException, status, Depends
-from datetime import datetime
+import os
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Response, status, Depends
+from datetime import datetime, timedelta
 from models import AccountCreate, AccountUpdate, AccountResponse
-from auth_utils import get_current_user, accounts_collection
+from auth_utils import (
+    ACCOUNT_CACHE_TTL,
+    get_current_user,
+    accounts_collection,
+    get_user_account_ids,
+    invalidate_user_accounts,
+    transactions_collection
+)
+from balances import serialize_balance
+from file_cleanup import enqueue_file_deletion
+from jobs import JOB_STALE_SECONDS, create_job, job_handler, jobs_collection, serialize_job, start_job
+from rollups import rollups_collection
+from routes.transactions import get_account_ids, record_transaction_changes
+from serializers import ACCOUNT_PROJECTION, ORJSONResponse, serialize_account
+from sync import record_tombstones
 from bson import ObjectId
-from typing import List
+from pymongo import ReturnDocument, UpdateOne
+from typing import List, Optional
+
+# Linked transactions are removed (or reassigned) this many at a time when an
+# account is deleted
+ACCOUNT_DELETE_BATCH = int(os.getenv("ACCOUNT_DELETE_BATCH", "1000"))
+
+# Fields the cascade needs to undo balances and rollups and release files
+CASCADE_PROJECTION = {
+    "type": 1,
+    "amount": 1,
+    "from_account_id": 1,
+    "to_account_id": 1,
+    "account_ids": 1,
+    "transaction_date": 1,
+    "document_files": 1
+}
 
 router = APIRouter(prefix="/accounts", tags=["Accounts"])
 
+@job_handler("delete_account")
+async def cascade_account_deletion(job: dict, progress) -> dict:
+    """
+    Delete an account and every transaction linked to it, or move them to
+    params["reassign_to"], one bounded batch at a time. Each batch updates
+    balances, rollups and sync tombstones and queues its attachments for
+    removal. Each batch only sees what's still linked, so a resumed job
+    picks up where the last one stopped.
+    """
+    user_id = job["user_id"]
+    account_id = job["params"]["account_id"]
+    reassign_to = job["params"].get("reassign_to")
+    result = {"deleted_transactions": 0, "reassigned_transactions": 0}
+
+    deleted_at = job["params"].get("deleted_at")
+    if deleted_at is None:
+        # The job is stored before the request deletes the account, so a job
+        # resumed after a crash in between finishes the deletion itself
+        deleted = await accounts_collection.delete_one({"_id": ObjectId(account_id), "user_id": user_id})
+        if deleted.deleted_count:
+            invalidate_user_accounts(user_id)
+            await record_tombstones(user_id, "account", [account_id])
+        deleted_at = datetime.utcnow()
+        await jobs_collection.update_one({"_id": job["_id"]}, {"$set": {"params.deleted_at": deleted_at}})
+
+    async def cascade_pass():
+        while True:
+            batch = await transactions_collection.find(
+                {"user_id": user_id, "account_ids": account_id},
+                CASCADE_PROJECTION
+            ).limit(ACCOUNT_DELETE_BATCH).to_list(None)
+            if not batch:
+                return
+
+            if reassign_to:
+                now = datetime.utcnow()
+                new_docs = []
+                for doc in batch:
+                    new_doc = {**doc, "updated_at": now}
+                    for field in ("from_account_id", "to_account_id"):
+                        if new_doc.get(field) == account_id:
+                            new_doc[field] = reassign_to
+                    new_doc["account_ids"] = get_account_ids(new_doc.get("from_account_id"), new_doc.get("to_account_id"))
+                    new_docs.append(new_doc)
+                await transactions_collection.bulk_write([
+                    UpdateOne(
+                        {"_id": doc["_id"], "user_id": user_id},
+                        {"$set": {
+                            "from_account_id": doc.get("from_account_id"),
+                            "to_account_id": doc.get("to_account_id"),
+                            "account_ids": doc["account_ids"],
+                            "updated_at": now
+                        }}
+                    )
+                    for doc in new_docs
+                ], ordered=False)
+                await record_transaction_changes(user_id, old_docs=batch, new_docs=new_docs)
+                result["reassigned_transactions"] += len(batch)
+            else:
+                transaction_ids = [doc["_id"] for doc in batch]
+                await transactions_collection.delete_many({"_id": {"$in": transaction_ids}, "user_id": user_id})
+                await record_transaction_changes(user_id, old_docs=batch)
+                await record_tombstones(user_id, "transaction", [str(i) for i in transaction_ids])
+                enqueue_file_deletion(user_id, (f for doc in batch for f in doc.get("document_files", [])))
+                result["deleted_transactions"] += len(batch)
+
+            await progress(len(batch))
+
+    await cascade_pass()
+
+    # Other workers may still have the account in their cached account ids
+    # and accept transactions on it until that entry expires; sweep once
+    # more after that. Waiting keeps the heartbeat fresh so the job isn't
+    # taken over as stale.
+    final_pass_at = deleted_at + timedelta(seconds=ACCOUNT_CACHE_TTL)
+    while True:
+        remaining = (final_pass_at - datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            break
+        await asyncio.sleep(min(remaining, JOB_STALE_SECONDS / 4))
+        await progress(0)
+    await cascade_pass()
+
+    # The account's buckets are all zero now
+    await rollups_collection.delete_many({"user_id": user_id, "account_id": account_id})
+    return result
+
 @router.post("/", response_model=dict)
 async def create_account(
     account: AccountCreate, 
@@ -24,44 +143,42 @@ async def create_account(
     }
     
     # Insert into database
-    result = accounts_collection.insert_one(account_doc)
+    await accounts_collection.insert_one(account_doc)
+    invalidate_user_accounts(str(current_user["_id"]))
     
     return {
         "message": "Account created successfully",
-        "account": {
-            "id": str(result.inserted_id),
-            "name": account.name,
-            "account_type": account.account_type.value,
-            "email": account.email,
-            "phone_number": account.phone_number,
-            "user_id": str(current_user["_id"]),
-            "created_at": account_doc["created_at"],
-            "updated_at": account_doc["updated_at"]
-        }
+        "account": serialize_account(account_doc)
     }
 
 @router.get("/", response_model=dict)
 async def get_user_accounts(current_user: dict = Depends(get_current_user)):
     # Get all accounts for the current user
-    accounts_cursor = accounts_collection.find({"user_id": str(current_user["_id"])})
-    accounts = []
-    
-    for account in accounts_cursor:
-        accounts.append({
-            "id": str(account["_id"]),
-            "name": account["name"],
-            "account_type": account["account_type"],
-            "email": account.get("email"),
-            "phone_number": account.get("phone_number"),
-            "user_id": account["user_id"],
-            "created_at": account["created_at"],
-            "updated_at": account["updated_at"]
-        })
+    accounts_cursor = accounts_collection.find({"user_id": str(current_user["_id"])}, ACCOUNT_PROJECTION)
+    accounts = [serialize_account(account) async for account in accounts_cursor]
     
-    return {
+    return ORJSONResponse({
         "accounts": accounts,
         "count": len(accounts)
-    }
+    })
+
+@router.get("/balances", response_model=dict)
+async def get_account_balances(current_user: dict = Depends(get_current_user)):
+    """
+    Get the stored balance of every account in one read.
+    Balances are maintained by the transaction write paths.
+    """
+    accounts_cursor = accounts_collection.find(
+        {"user_id": str(current_user["_id"])},
+        {"name": 1, "balance": 1, "total_inflow": 1, "total_outflow": 1}
+    )
+    balances = [serialize_balance(account) async for account in accounts_cursor]
+    
+    return ORJSONResponse({
+        "balances": balances,
+        "total_balance": round(sum(b["balance"] for b in balances), 2),
+        "count": len(balances)
+    })
 
 @router.get("/{account_id}", response_model=dict)
 async def get_account(
@@ -78,10 +195,10 @@ async def get_account(
         )
     
     # Find account
-    account = accounts_collection.find_one({
+    account = await accounts_collection.find_one({
         "_id": obj_id,
         "user_id": str(current_user["_id"])
-    })
+    }, ACCOUNT_PROJECTION)
     
     if not account:
         raise HTTPException(
@@ -89,18 +206,7 @@ async def get_account(
             detail="Account not found"
         )
     
-    return {
-        "account": {
-            "id": str(account["_id"]),
-            "name": account["name"],
-            "account_type": account["account_type"],
-            "email": account.get("email"),
-            "phone_number": account.get("phone_number"),
-            "user_id": account["user_id"],
-            "created_at": account["created_at"],
-            "updated_at": account["updated_at"]
-        }
-    }
+    return {"account": serialize_account(account)}
 
 @router.put("/{account_id}", response_model=dict)
 async def update_account(
@@ -129,43 +235,42 @@ async def update_account(
     if account_update.phone_number is not None:
         update_doc["phone_number"] = account_update.phone_number
     
-    # Update account
-    result = accounts_collection.update_one(
+    # Update account and get the updated version in one round trip
+    updated_account = await accounts_collection.find_one_and_update(
         {
             "_id": obj_id,
             "user_id": str(current_user["_id"])
         },
-        {"$set": update_doc}
+        {"$set": update_doc},
+        projection=ACCOUNT_PROJECTION,
+        return_document=ReturnDocument.AFTER
     )
     
-    if result.matched_count == 0:
+    if not updated_account:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Account not found"
         )
     
-    # Get updated account
-    updated_account = accounts_collection.find_one({"_id": obj_id})
-    
     return {
         "message": "Account updated successfully",
-        "account": {
-            "id": str(updated_account["_id"]),
-            "name": updated_account["name"],
-            "account_type": updated_account["account_type"],
-            "email": updated_account.get("email"),
-            "phone_number": updated_account.get("phone_number"),
-            "user_id": updated_account["user_id"],
-            "created_at": updated_account["created_at"],
-            "updated_at": updated_account["updated_at"]
-        }
+        "account": serialize_account(updated_account)
     }
 
 @router.delete("/{account_id}", response_model=dict)
 async def delete_account(
     account_id: str,
+    response: Response,
+    reassign_to: Optional[str] = Query(None, description="Move linked transactions to this account instead of deleting them"),
     current_user: dict = Depends(get_current_user)
 ):
+    """
+    Delete an account. Its transactions are deleted (or reassigned) by a
+    background job, so the response is 202 with the job, which can be
+    polled at /jobs/{id}.
+    """
+    user_id = str(current_user["_id"])
+    
     # Validate ObjectId
     try:
         obj_id = ObjectId(account_id)
@@ -175,16 +280,52 @@ async def delete_account(
             detail="Invalid account ID"
         )
     
+    if reassign_to is not None:
+        if reassign_to == account_id or reassign_to not in await get_user_account_ids(user_id, require=(reassign_to,)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid reassign_to account"
+            )
+    
+    if not await accounts_collection.find_one({"_id": obj_id, "user_id": user_id}, {"_id": 1}):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Account not found"
+        )
+    
+    # Store the job before deleting the account so the cascade can't be lost
+    # in between; it only starts once the account is gone
+    linked = await transactions_collection.count_documents({"user_id": user_id, "account_ids": account_id})
+    job = await create_job(
+        user_id,
+        "delete_account",
+        {"account_id": account_id, "reassign_to": reassign_to},
+        total=linked,
+        start=False
+    )
+    
     # Delete account
-    result = accounts_collection.delete_one({
+    result = await accounts_collection.delete_one({
         "_id": obj_id,
-        "user_id": str(current_user["_id"])
+        "user_id": user_id
     })
     
     if result.deleted_count == 0:
+        await jobs_collection.delete_one({"_id": job["_id"]})
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Account not found"
         )
+    invalidate_user_accounts(user_id)
+    await record_tombstones(user_id, "account", [account_id])
+    start_job(job["_id"])
     
-    return {"message": "Account deleted successfully"}
\ No newline at end of file
+    response.status_code = status.HTTP_202_ACCEPTED
+    message = "Account deleted successfully"
+    if linked:
+        action = "reassigned" if reassign_to else "removed"
+        message += f". {linked} linked transaction(s) are being {action}"
+    return {
+        "message": message,
+        "job": serialize_job(job)
+    }
@@ -3,11 +3,12 @@ from fastapi import APIRouter, HTTPException, status, Depends
 from datetime import timedelta
 from models import UserSignUp, UserSignIn, UserResponse, Token
 from auth_utils import (
-    get_password_hash, 
-    verify_password, 
+    get_password_hash_async,
+    verify_password_async,
     create_access_token, 
     users_collection,
     get_current_user,
+    invalidate_user,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
 from datetime import datetime
@@ -18,7 +19,7 @@ router = APIRouter(prefix="/auth", tags=["Authentication"])
 @router.post("/signup", response_model=dict)
 async def sign_up(user: UserSignUp):
     # Check if user already exists
-    existing_user = users_collection.find_one({"email": user.email})
+    existing_user = await users_collection.find_one({"email": user.email})
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -26,7 +27,7 @@ async def sign_up(user: UserSignUp):
         )
     
     # Hash password and create user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     user_doc = {
         "full_name": user.full_name,
         "email": user.email,
@@ -34,7 +35,8 @@ async def sign_up(user: UserSignUp):
         "created_at": datetime.utcnow()
     }
     
-    result = users_collection.insert_one(user_doc)
+    result = await users_collection.insert_one(user_doc)
+    invalidate_user(user.email)
     
     # Create access token with longer expiration for persistent login
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -56,7 +58,7 @@ async def sign_up(user: UserSignUp):
 @router.post("/signin", response_model=dict)
 async def sign_in(user: UserSignIn):
     # Find user by email
-    db_user = users_collection.find_one({"email": user.email})
+    db_user = await users_collection.find_one({"email": user.email})
     
     if not db_user:
         raise HTTPException(
@@ -73,7 +75,7 @@ async def sign_in(user: UserSignIn):
         )
     
     # Verify password
-    if not verify_password(user.password, db_user["hashed_password"]):
+    if not await verify_password_async(user.password, db_user["hashed_password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -118,7 +120,7 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 # Debug endpoint to check user structure (remove in production)
 @router.get("/debug/user/{email}")
 async def debug_user(email: str):
-    user = users_collection.find_one({"email": email})
+    user = await users_collection.find_one({"email": email})
     if user:
         # Remove sensitive data before returning
         user.pop("hashed_password", None)
@@ -129,5 +131,6 @@ async def debug_user(email: str):
 # Temporary cleanup endpoint (remove in production)
 @router.delete("/debug/cleanup/{email}")
 async def cleanup_user(email: str):
-    result = users_collection.delete_one({"email": email})
+    result = await users_collection.delete_one({"email": email})
+    invalidate_user(email)
     return {"deleted_count": result.deleted_count}
\ No newline at end of file
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from auth_utils import get_current_user
+from jobs import get_job, serialize_job
+from bson import ObjectId
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+@router.get("/{job_id}", response_model=dict)
+async def get_job_status(
+    job_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Status and progress of a background job started by one of the user's requests."""
+    # Validate ObjectId
+    try:
+        obj_id = ObjectId(job_id)
+    except:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid job ID"
+        )
+    
+    job = await get_job(obj_id, str(current_user["_id"]))
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    return {"job": serialize_job(job)}
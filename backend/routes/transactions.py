@@ -1,102 +1,340 @@
 import os
+import asyncio
+import base64
+import calendar
+import json
 from pathlib import Path
 import uuid
-from fastapi import APIRouter, File, HTTPException, UploadFile, status, Depends, Query
+import anyio
+from fastapi import APIRouter, HTTPException, Request, status, Depends, Query
 from datetime import datetime
+from email.utils import formatdate, parsedate_to_datetime
 
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from models import (
     TransactionCreate, 
     TransactionUpdate, 
     TransactionResponse, 
     MultipleTransactionsCreate
 )
-from auth_utils import get_current_user, transactions_collection, accounts_collection
+from auth_utils import (
+    accounts_collection,
+    db,
+    get_current_user,
+    get_user_account_ids,
+    transactions_collection
+)
+from balances import apply_balance_changes
+from rollups import apply_rollup_changes, build_timeseries, summarize_range
+from cache import TTLCache
+from serializers import ORJSONResponse, TRANSACTION_PROJECTION, serialize_transaction
+from sync import (
+    SyncTokenExpired,
+    changed_after,
+    decode_sync_token,
+    encode_sync_token,
+    next_position,
+    record_tombstones,
+    sync_upper_bound,
+    tombstones_collection
+)
+from importers import IMPORT_FORMATS, iter_import_batches
+from exporters import (
+    EXPORT_MEDIA_TYPES,
+    EXPORT_PROJECTION,
+    gzip_stream,
+    parquet_available,
+    stream_export
+)
+from file_store import (
+    TEMP_DIR,
+    create_file_handle,
+    resolve_file,
+    store_blob,
+    thumbnail_path
+)
+from file_cleanup import enqueue_file_deletion
+from multipart_uploads import InvalidUpload, UploadTooLarge, receive_files
+from thumbnails import THUMBNAIL_CONTENT_TYPE, THUMBNAIL_EXTENSIONS, enqueue_thumbnail
 from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
 from typing import List, Optional
 import logging
 
-# Add this constant after the imports
-UPLOAD_DIR = "uploads/transaction_documents"
+MAX_UPLOAD_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+
+# Statement imports are parsed and inserted in batches of this many rows
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+MAX_IMPORT_FILE_SIZE = int(os.getenv("MAX_IMPORT_FILE_SIZE", str(50 * 1024 * 1024)))
+MAX_IMPORT_REPORTED_ERRORS = 1000
 
-# Ensure upload directory exists - add this after the router definition
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Exports read the cursor and encode output in batches of this many rows
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+
+# A stored filename always refers to the same bytes, so clients may cache it
+FILE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+# ?variant=thumb served with the original while the preview is being rendered
+THUMBNAIL_PENDING_CACHE_CONTROL = "private, max-age=60"
 
 logger = logging.getLogger(__name__)
 
+# Per-user cache of total transaction counts:
+# {user_id: (version, {account_id or None: count})}.
+# Every transaction write path bumps the user's version in
+# transaction_versions; an entry taken at an older version is reloaded, so
+# writes through any worker invalidate every worker's cache.
+transaction_count_cache = TTLCache(
+    maxsize=int(os.getenv("TRANSACTION_COUNT_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("TRANSACTION_COUNT_CACHE_TTL", "300"))
+)
+transaction_versions_collection = db.transaction_versions
+
+# Counts above this are reported as estimates in total_mode=estimated
+ESTIMATED_COUNT_CAP = int(os.getenv("ESTIMATED_COUNT_CAP", "10000"))
+
 router = APIRouter(prefix="/transactions", tags=["Transactions"])
 
-def cleanup_transaction_files(document_files: List[str]) -> dict:
+def get_account_ids(from_account_id: Optional[str], to_account_id: Optional[str]) -> List[str]:
     """
-    Helper function to clean up files associated with a transaction.
-    Returns a dictionary with deletion results.
+    Build the denormalized account_ids array stored on each transaction so
+    account filters can use a single multikey index instead of an $or.
     """
-    deleted_files = []
-    failed_files = []
-    
-    for filename in document_files:
-        if filename:  # Check if filename is not empty
-            file_path = os.path.join(UPLOAD_DIR, filename)
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-                    deleted_files.append(filename)
-                    logger.info(f"Deleted file: {filename}")
-                else:
-                    logger.warning(f"File not found for deletion: {filename}")
-                    failed_files.append(f"{filename} (not found)")
-            except Exception as file_error:
-                logger.error(f"Error deleting file {filename}: {str(file_error)}")
-                failed_files.append(f"{filename} (deletion error)")
+    account_ids = []
+    for account_id in (from_account_id, to_account_id):
+        if account_id and account_id not in account_ids:
+            account_ids.append(account_id)
+    return account_ids
+
+def build_transaction_doc(transaction: TransactionCreate, user_id: str) -> dict:
+    now = datetime.utcnow()
+    return {
+        "type": transaction.type.value,
+        "amount": transaction.amount,
+        "from_account_id": transaction.from_account_id,
+        "to_account_id": transaction.to_account_id,
+        "account_ids": get_account_ids(transaction.from_account_id, transaction.to_account_id),
+        "detail": transaction.detail,
+        "document_files": transaction.document_files or [],
+        "user_id": user_id,
+        "transaction_date": transaction.transaction_date or now,
+        "created_at": now,
+        "updated_at": now
+    }
+
+async def validate_account_ownership(
+    user_id: str,
+    from_account_id: Optional[str],
+    to_account_id: Optional[str]
+):
+    """
+    Check that the given (non-empty) accounts belong to the user against the
+    cached account id set. Raises a 400 naming the first account that doesn't.
+    """
+    requested = [a for a in (from_account_id, to_account_id) if a]
+    if not requested:
+        return
+    owned = await get_user_account_ids(user_id, requested)
     
+    if from_account_id and from_account_id not in owned:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="From account not found or does not belong to user"
+        )
+    if to_account_id and to_account_id not in owned:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="To account not found or does not belong to user"
+        )
+
+async def validate_account_filter(user_id: str, account_id: str):
+    if account_id not in await get_user_account_ids(user_id, [account_id]):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Account not found or does not belong to user"
+        )
+
+async def record_transaction_changes(
+    user_id: str,
+    old_docs: Optional[list] = None,
+    new_docs: Optional[list] = None
+):
+    """
+    Update everything derived from transactions after a write: stored account
+    balances, analytics rollups and the cached transaction count. The writes
+    are independent (one bulk write each), so they run concurrently and add
+    a single round trip after the main write.
+    """
+    await asyncio.gather(
+        apply_balance_changes(user_id, old_docs=old_docs, new_docs=new_docs),
+        apply_rollup_changes(user_id, old_docs=old_docs, new_docs=new_docs),
+        transaction_versions_collection.update_one(
+            {"_id": user_id},
+            {"$inc": {"version": 1}},
+            upsert=True
+        )
+    )
+    transaction_count_cache.delete(user_id)
+
+async def count_transactions(user_id: str, account_id: Optional[str], query: dict, total_mode: str) -> tuple:
+    """
+    Count the transactions matching query according to total_mode.
+    Returns (total, is_exact).
+    """
+    if total_mode == "estimated":
+        # Bounded count: stops scanning once the cap is reached
+        total = await transactions_collection.count_documents(query, limit=ESTIMATED_COUNT_CAP)
+        return total, total < ESTIMATED_COUNT_CAP
+
+    user_counts = None
+    if total_mode == "cached":
+        # A point read of the user's write version is much cheaper than a count
+        version_doc = await transaction_versions_collection.find_one({"_id": user_id})
+        version = version_doc["version"] if version_doc else 0
+        cached = transaction_count_cache.get(user_id)
+        user_counts = cached[1] if cached and cached[0] == version else {}
+        if account_id in user_counts:
+            return user_counts[account_id], True
+
+    total = await transactions_collection.count_documents(query)
+
+    if user_counts is not None:
+        user_counts[account_id] = total
+        transaction_count_cache.set(user_id, (version, user_counts))
+
+    return total, True
+
+def is_not_modified(request: Request, etag: Optional[str], last_modified: datetime) -> bool:
+    """
+    Evaluate If-None-Match / If-Modified-Since against a file's validators.
+    If-None-Match takes precedence when both are sent.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return etag is not None and etag in candidates
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            since = parsedate_to_datetime(if_modified_since).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+def encode_cursor(transaction: dict) -> str:
+    """
+    Encode the (transaction_date, _id) position of a transaction into an
+    opaque cursor for keyset pagination.
+    """
+    raw = json.dumps({
+        "d": transaction["transaction_date"].isoformat(),
+        "i": str(transaction["_id"])
+    })
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> tuple:
+    """
+    Decode a cursor produced by encode_cursor into (transaction_date, ObjectId).
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(raw["d"]), ObjectId(raw["i"])
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+# Both file endpoints read the multipart body themselves (see
+# multipart_uploads), so the OpenAPI schema is spelled out here
+def multipart_body(field_name: str, multiple: bool) -> dict:
+    file_schema = {"type": "string", "format": "binary"}
     return {
-        "deleted_files": deleted_files,
-        "failed_files": failed_files
+        "requestBody": {
+            "required": True,
+            "content": {
+                "multipart/form-data": {
+                    "schema": {
+                        "type": "object",
+                        "required": [field_name],
+                        "properties": {
+                            field_name: {"type": "array", "items": file_schema} if multiple else file_schema
+                        }
+                    }
+                }
+            }
+        }
     }
 
-@router.post("/upload-files", response_model=dict)
+@router.post("/upload-files", response_model=dict, openapi_extra=multipart_body("files", multiple=True))
 async def upload_transaction_files(
-    files: List[UploadFile] = File(...),
+    request: Request,
     current_user: dict = Depends(get_current_user)
 ):
+    """
+    Upload attachments as multipart field "files". Each file is streamed
+    straight from the request body to disk, so an oversized or disallowed
+    file fails the request as soon as it is seen.
+    """
+    received = []
     try:
         user_id = str(current_user["_id"])
         uploaded_files = []
         
         # Validate file types and sizes
         allowed_extensions = {'.pdf', '.jpg', '.jpeg', '.png', '.gif', '.doc', '.docx', '.txt'}
-        max_file_size = 10 * 1024 * 1024  # 10MB
         
-        for file in files:
-            # Check file extension
-            file_extension = Path(file.filename).suffix.lower()
+        def check_extension(filename: str):
+            file_extension = Path(filename).suffix.lower()
             if file_extension not in allowed_extensions:
                 raise HTTPException(
                     status_code=status.HTTP_400_BAD_REQUEST,
                     detail=f"File type {file_extension} not allowed. Allowed types: {', '.join(allowed_extensions)}"
                 )
-            
-            # Check file size
-            file_content = await file.read()
-            if len(file_content) > max_file_size:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"File {file.filename} is too large. Maximum size is 10MB"
-                )
-            
+        
+        # Save files, enforcing the size limit while the body is read
+        try:
+            received = await receive_files(
+                request, "files", TEMP_DIR, MAX_UPLOAD_FILE_SIZE, check_filename=check_extension
+            )
+        except UploadTooLarge as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File {e.filename} is too large. Maximum size is 10MB"
+            )
+        except InvalidUpload as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if not received:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No files uploaded")
+        
+        for file in received:
             # Generate unique filename
             unique_filename = f"{user_id}_{uuid.uuid4().hex}_{file.filename}"
-            file_path = os.path.join(UPLOAD_DIR, unique_filename)
             
-            # Save file
-            with open(file_path, "wb") as buffer:
-                buffer.write(file_content)
+            # Move into the content-addressed store (deduplicated by hash)
+            file_path = await store_blob(file.path, file.sha256, file.size)
+            await create_file_handle(
+                unique_filename,
+                user_id,
+                file.sha256,
+                file.size,
+                file.filename,
+                file.content_type
+            )
+            
+            # Previews are rendered in the background; the upload doesn't wait
+            if Path(file.filename).suffix.lower() in THUMBNAIL_EXTENSIONS:
+                enqueue_thumbnail(file_path, thumbnail_path(file.sha256))
             
             uploaded_files.append({
                 "original_filename": file.filename,
                 "stored_filename": unique_filename,
                 "file_path": file_path,
-                "file_size": len(file_content),
+                "file_size": file.size,
+                "sha256": file.sha256,
                 "content_type": file.content_type,
                 "upload_date": datetime.utcnow()
             })
@@ -106,19 +344,35 @@ async def upload_transaction_files(
             "files": uploaded_files
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error uploading files: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to upload files"
         )
+    finally:
+        # Temp files not yet moved into the store (store_blob consumes them)
+        for file in received:
+            await anyio.Path(file.path).unlink(missing_ok=True)
 
 # Add this endpoint to serve uploaded files
-@router.get("/files/{filename}")
+@router.api_route("/files/{filename}", methods=["GET", "HEAD"])
 async def get_transaction_file(
     filename: str,
+    request: Request,
+    variant: Optional[str] = Query(None, pattern="^thumb$", description="Set to 'thumb' for a small preview image"),
     current_user: dict = Depends(get_current_user)
 ):
+    """
+    Serve an uploaded file with a strong ETag (its SHA-256), Last-Modified
+    and Cache-Control. Conditional requests get 304; Range requests are
+    answered with partial content.
+    With variant=thumb the preview image is served once it has been
+    generated; until then the original file is returned, briefly cacheable
+    and without validators.
+    """
     try:
         user_id = str(current_user["_id"])
         
@@ -129,19 +383,69 @@ async def get_transaction_file(
                 detail="Access denied"
             )
         
-        file_path = os.path.join(UPLOAD_DIR, filename)
+        file_info = await resolve_file(filename)
         
-        if not os.path.exists(file_path):
+        if not file_info:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="File not found"
             )
         
-        return FileResponse(
-            path=file_path,
-            filename=filename.split('_', 2)[-1]  # Return original filename
+        path = file_info["path"]
+        etag = f'"{file_info["sha256"]}"' if file_info["sha256"] else None
+        media_type = None
+        download_name = filename.split('_', 2)[-1]  # Return original filename
+        
+        thumbnail_pending = False
+        if variant == "thumb":
+            thumb = thumbnail_path(file_info["sha256"]) if file_info["sha256"] else None
+            if thumb and await anyio.Path(thumb).exists():
+                path = thumb
+                etag = f'"{file_info["sha256"]}-thumb"'
+                media_type = THUMBNAIL_CONTENT_TYPE
+                download_name = None
+            else:
+                thumbnail_pending = True
+                if thumb and Path(filename).suffix.lower() in THUMBNAIL_EXTENSIONS:
+                    # Not rendered yet (e.g. uploaded before thumbnails existed)
+                    enqueue_thumbnail(path, thumb)
+        
+        if thumbnail_pending:
+            # Stand-in for a preview that may exist shortly: no validators and
+            # only a short cache lifetime, so the client picks up the real one
+            headers = {
+                "Cache-Control": THUMBNAIL_PENDING_CACHE_CONTROL,
+                "Accept-Ranges": "bytes"
+            }
+        else:
+            last_modified = file_info["last_modified"]
+            headers = {
+                "Cache-Control": FILE_CACHE_CONTROL,
+                "Last-Modified": formatdate(calendar.timegm(last_modified.utctimetuple()), usegmt=True),
+                "Accept-Ranges": "bytes"
+            }
+            if etag:
+                headers["ETag"] = etag
+            
+            if is_not_modified(request, etag, last_modified):
+                return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        
+        # FileResponse handles Range / If-Range using the headers above
+        response = FileResponse(
+            path=path,
+            filename=download_name,
+            media_type=media_type,
+            headers=headers,
+            stat_result=await anyio.Path(path).stat()
         )
+        if thumbnail_pending:
+            # Drop the validators FileResponse derives from the file's stat
+            del response.headers["etag"]
+            del response.headers["last-modified"]
+        return response
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error serving file: {str(e)}")
         raise HTTPException(
@@ -158,67 +462,23 @@ async def create_transaction(
     try:
         user_id = str(current_user["_id"])
         
-        # Validate account ownership for from_account_id
-        if transaction.from_account_id:
-            from_account = accounts_collection.find_one({
-                "_id": ObjectId(transaction.from_account_id),
-                "user_id": user_id
-            })
-            if not from_account:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="From account not found or does not belong to user"
-                )
-        
-        # Validate account ownership for to_account_id
-        if transaction.to_account_id:
-            to_account = accounts_collection.find_one({
-                "_id": ObjectId(transaction.to_account_id),
-                "user_id": user_id
-            })
-            if not to_account:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="To account not found or does not belong to user"
-                )
+        # Validate account ownership
+        await validate_account_ownership(user_id, transaction.from_account_id, transaction.to_account_id)
         
         # Create transaction document
-        transaction_doc = {
-            "type": transaction.type.value,
-            "amount": transaction.amount,
-            "from_account_id": transaction.from_account_id,
-            "to_account_id": transaction.to_account_id,
-            "detail": transaction.detail,
-            "document_files": transaction.document_files or [],  # Changed from document_record
-            "user_id": user_id,
-            "transaction_date": transaction.transaction_date or datetime.utcnow(),
-            "created_at": datetime.utcnow(),
-            "updated_at": datetime.utcnow()
-        }
+        transaction_doc = build_transaction_doc(transaction, user_id)
         
         # Insert into database
-        result = transactions_collection.insert_one(transaction_doc)
-        
-        # Prepare response
-        created_transaction = {
-            "id": str(result.inserted_id),
-            "type": transaction.type.value,
-            "amount": transaction.amount,
-            "from_account_id": transaction.from_account_id,
-            "to_account_id": transaction.to_account_id,
-            "detail": transaction.detail,
-            "document_files": transaction_doc["document_files"],  # Changed from document_record
-            "user_id": user_id,
-            "transaction_date": transaction_doc["transaction_date"],
-            "created_at": transaction_doc["created_at"],
-            "updated_at": transaction_doc["updated_at"]
-        }
+        await transactions_collection.insert_one(transaction_doc)
+        await record_transaction_changes(user_id, new_docs=[transaction_doc])
         
         return {
             "message": "Transaction created successfully",
-            "transaction": created_transaction
+            "transaction": serialize_transaction(transaction_doc)
         }
         
+    except HTTPException:
+        raise
     except ValueError as ve:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -234,119 +494,219 @@ async def create_transaction(
 @router.post("/multiple", response_model=dict)
 async def create_multiple_transactions(
     request: MultipleTransactionsCreate,
+    ordered: bool = Query(True, description="If false, valid items are created even when others fail"),
     current_user: dict = Depends(get_current_user)
 ):
+    """
+    Create a batch of transactions with a single insert. Created transactions
+    are returned in input order. With ordered=false, items that fail account
+    validation or the insert are reported in `errors` (by input index) and
+    the rest are still created.
+    """
     try:
         user_id = str(current_user["_id"])
-        created_transaction_docs = [] # Changed variable name for clarity
+        errors = []
+        transaction_docs = []  # (input index, document)
 
-        # Get all user accounts for validation
-        user_accounts = list(accounts_collection.find({"user_id": user_id}))
-        user_account_ids = [str(acc["_id"]) for acc in user_accounts]
+        # Get all user account ids for validation
+        user_account_ids = await get_user_account_ids(user_id, {
+            account_id
+            for transaction in request.transactions
+            for account_id in (transaction.from_account_id, transaction.to_account_id)
+            if account_id
+        })
 
-        for transaction in request.transactions:
+        for index, transaction in enumerate(request.transactions):
             # Validate account ownership
+            error = None
             if transaction.from_account_id and transaction.from_account_id not in user_account_ids:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"From account {transaction.from_account_id} not found or does not belong to user"
-                )
+                error = f"From account {transaction.from_account_id} not found or does not belong to user"
+            elif transaction.to_account_id and transaction.to_account_id not in user_account_ids:
+                error = f"To account {transaction.to_account_id} not found or does not belong to user"
 
-            if transaction.to_account_id and transaction.to_account_id not in user_account_ids:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail=f"To account {transaction.to_account_id} not found or does not belong to user"
-                )
+            if error:
+                if ordered:
+                    raise HTTPException(
+                        status_code=status.HTTP_400_BAD_REQUEST,
+                        detail=error
+                    )
+                errors.append({"index": index, "error": error})
+                continue
 
-            # Create transaction document
-            transaction_doc = {
-                "type": transaction.type.value,
-                "amount": transaction.amount,
-                "from_account_id": transaction.from_account_id,
-                "to_account_id": transaction.to_account_id,
-                "detail": transaction.detail,
-                "document_files": transaction.document_files or [],
-                "user_id": user_id, # Ensure user_id is a string
-                "transaction_date": transaction.transaction_date or datetime.utcnow(),
-                "created_at": datetime.utcnow(),
-                "updated_at": datetime.utcnow()
-            }
-            created_transaction_docs.append(transaction_doc)
+            transaction_docs.append((index, build_transaction_doc(transaction, user_id)))
 
-        # Insert all transactions
-        # Use a session for atomicity if needed, but for simple inserts, this is fine.
-        if not created_transaction_docs:
-             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="No transactions provided to create."
-            )
-        
-        result = transactions_collection.insert_many(created_transaction_docs)
+        # Insert all transactions. insert_many assigns each document its _id
+        # in place, so the response is built from memory without a read-back.
+        docs = [doc for _, doc in transaction_docs]
+        inserted = transaction_docs
+        if docs:
+            try:
+                await transactions_collection.insert_many(docs, ordered=ordered)
+            except BulkWriteError as bwe:
+                failed = {error["index"]: error["errmsg"] for error in bwe.details["writeErrors"]}
+                if ordered:
+                    # An ordered insert stops at the first failure
+                    first_failed = min(failed)
+                    failed.update({
+                        i: "Not inserted because an earlier transaction failed"
+                        for i in range(first_failed + 1, len(docs))
+                    })
+                inserted = [item for i, item in enumerate(transaction_docs) if i not in failed]
+                errors += [
+                    {"index": transaction_docs[i][0], "error": message}
+                    for i, message in sorted(failed.items())
+                ]
+            await record_transaction_changes(user_id, new_docs=[doc for _, doc in inserted])
 
-        # Prepare response
-        response_transactions_data = []
-        # Fetch the inserted documents to ensure correct serialization
-        inserted_ids_str = [str(oid) for oid in result.inserted_ids]
-        
-        # Retrieve the actual documents from the DB to ensure all types are serializable
-        # This is the most robust way to handle potential ObjectId issues.
-        # We query by the inserted IDs.
-        fetched_docs_cursor = transactions_collection.find(
-            {"_id": {"$in": result.inserted_ids}}
-        )
+        response_transactions_data = [serialize_transaction(doc, id_key="_id") for _, doc in inserted]
 
-        for doc in fetched_docs_cursor:
-            # Ensure all potential ObjectIds are strings
-            serialized_doc = {
-                "_id": str(doc["_id"]),
-                "type": doc["type"],
-                "amount": doc["amount"],
-                "from_account_id": doc.get("from_account_id"),
-                "to_account_id": doc.get("to_account_id"),
-                "detail": doc["detail"],
-                "document_files": doc.get("document_files", []),  # Changed from document_record
-                "user_id": doc["user_id"],
-                "transaction_date": doc["transaction_date"],
-                "created_at": doc["created_at"],
-                "updated_at": doc["updated_at"]
-            }
+        return ORJSONResponse({
+            "message": f"{len(response_transactions_data)} transactions created successfully",
+            "transactions": response_transactions_data,
+            "count": len(response_transactions_data),
+            "failed": len(errors),
+            "errors": sorted(errors, key=lambda error: error["index"])
+        })
 
-            response_transactions_data.append(serialized_doc)
-            
-        # Sort the response to match the order of insertion if necessary,
-        # or just return them as fetched. Fetching by $in might not guarantee order.
-        # A more robust way would be to map back to the original insertion order.
-        # For simplicity now, we'll use the fetched order.
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error creating multiple transactions: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create transactions"
+        )
 
+@router.post("/import", response_model=dict, openapi_extra=multipart_body("file", multiple=False))
+async def import_transactions(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(csv|ofx)$", description="Defaults to the file extension"),
+    account_id: Optional[str] = Query(None, description="Account the statement belongs to (id or name)"),
+    date_format: Optional[str] = Query(None, description="strptime format for CSV dates, e.g. %d/%m/%Y (default ISO 8601)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Import a CSV or OFX bank statement (multipart field "file"). The file is
+    streamed from the request body to disk, parsed
+    row by row and written in batches with unordered inserts, so a bad row
+    never blocks the rest. Returns counts plus per-row errors.
+    CSV needs date and amount columns; detail, type, account (id or name),
+    from_account_id and to_account_id are optional. Without a type, negative
+    amounts are outflows from the account and positive ones inflows to it.
+    """
+    user_id = str(current_user["_id"])
+    file_format = format
+    
+    def check_format(filename: str):
+        nonlocal file_format
+        file_format = format or Path(filename).suffix.lower().lstrip(".")
+        if file_format not in IMPORT_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unsupported import format. Allowed formats: {', '.join(IMPORT_FORMATS)}"
+            )
+    
+    if format:
+        check_format("")
+    
+    # Preload the user's accounts once; rows may reference them by id or name
+    accounts = {}
+    async for account in accounts_collection.find({"user_id": user_id}, {"name": 1}):
+        accounts[str(account["_id"])] = str(account["_id"])
+        accounts.setdefault(account["name"].lower(), str(account["_id"]))
+    if account_id:
+        # Accept a name like the rows do, but store the id
+        resolved_account_id = accounts.get(account_id) or accounts.get(account_id.lower())
+        if not resolved_account_id:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Account not found or does not belong to user"
+            )
+        account_id = resolved_account_id
+    
+    temp_path = None
+    imported = 0
+    errors = []
+    error_count = 0
+    total_rows = 0
+    try:
+        try:
+            received = await receive_files(
+                request, "file", TEMP_DIR, MAX_IMPORT_FILE_SIZE, max_files=1, check_filename=check_format
+            )
+        except UploadTooLarge:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File is too large. Maximum size is {MAX_IMPORT_FILE_SIZE // (1024 * 1024)}MB"
+            )
+        except InvalidUpload as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if not received:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No file uploaded")
+        temp_path = received[0].path
+        
+        batches = iter_import_batches(
+            temp_path, file_format, accounts, account_id, date_format, IMPORT_BATCH_SIZE
+        )
+        while True:
+            # Parsing is CPU-bound; keep it off the event loop
+            batch = await anyio.to_thread.run_sync(next, batches, None)
+            if batch is None:
+                break
+            valid, row_errors = batch
+            total_rows += len(valid) + len(row_errors)
+            
+            docs = [build_transaction_doc(transaction, user_id) for _, transaction in valid]
+            if docs:
+                try:
+                    await transactions_collection.insert_many(docs, ordered=False)
+                    inserted_docs = docs
+                except BulkWriteError as bwe:
+                    failed = {error["index"]: error["errmsg"] for error in bwe.details["writeErrors"]}
+                    inserted_docs = [doc for i, doc in enumerate(docs) if i not in failed]
+                    row_errors += [{"row": valid[i][0], "error": message} for i, message in failed.items()]
+                await record_transaction_changes(user_id, new_docs=inserted_docs)
+                imported += len(inserted_docs)
+            
+            error_count += len(row_errors)
+            errors.extend(row_errors[:MAX_IMPORT_REPORTED_ERRORS - len(errors)])
+            logger.info(f"Import for user {user_id}: {total_rows} rows processed, {imported} imported")
+        
         return {
-            "message": f"{len(response_transactions_data)} transactions created successfully",
-            "transactions": response_transactions_data,
-            "count": len(response_transactions_data)
+            "message": f"{imported} transactions imported successfully",
+            "imported": imported,
+            "failed": error_count,
+            "total_rows": total_rows,
+            "errors": sorted(errors, key=lambda error: error["row"]),
+            "errors_truncated": error_count > len(errors)
         }
-
+    
+    except HTTPException:
+        raise
     except ValueError as ve:
-        # This catches validation errors from Pydantic models
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(ve)
         )
-    except HTTPException as http_exc:
-        # Re-raise HTTPException to preserve status code and detail
-        raise http_exc
     except Exception as e:
-        logger.error(f"Error creating multiple transactions: {str(e)}")
+        logger.error(f"Error importing transactions: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Failed to create transactions"
+            detail="Failed to import transactions"
         )
-
+    finally:
+        if temp_path:
+            await anyio.Path(temp_path).unlink(missing_ok=True)
 
 @router.get("/", response_model=dict)
 async def get_transactions(
     current_user: dict = Depends(get_current_user),
     limit: Optional[int] = Query(50, ge=1, le=100, description="Number of transactions to return"),
-    offset: Optional[int] = Query(0, ge=0, description="Number of transactions to skip"),
-    account_id: Optional[str] = Query(None, description="Filter by account ID")
+    offset: Optional[int] = Query(0, ge=0, description="Number of transactions to skip (ignored when cursor is set)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous page's next_cursor"),
+    account_id: Optional[str] = Query(None, description="Filter by account ID"),
+    include_total: bool = Query(True, description="Include the total number of matching transactions"),
+    total_mode: str = Query("exact", pattern="^(exact|cached|estimated)$", description="How the total is computed: exact, cached or estimated")
 ):
     try:
         user_id = str(current_user["_id"])
@@ -356,55 +716,61 @@ async def get_transactions(
         
         if account_id:
             # Validate account ownership
-            account = accounts_collection.find_one({
-                "_id": ObjectId(account_id),
-                "user_id": user_id
-            })
-            if not account:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Account not found or does not belong to user"
-                )
+            await validate_account_filter(user_id, account_id)
             
             # Filter transactions by account (either from or to)
-            query["$or"] = [
-                {"from_account_id": account_id},
-                {"to_account_id": account_id}
-            ]
+            query["account_ids"] = account_id
         
-        # Get total count
-        total_count = transactions_collection.count_documents(query)
-        
-        # Get transactions with pagination, sorted by transaction_date descending
-        transactions_cursor = transactions_collection.find(query)\
-            .sort("transaction_date", -1)\
-            .skip(offset)\
-            .limit(limit)
-        
-        transactions = []
-        for transaction in transactions_cursor:
-            transactions.append({
-                "id": str(transaction["_id"]),
-                "type": transaction["type"],
-                "amount": transaction["amount"],
-                "from_account_id": transaction.get("from_account_id"),
-                "to_account_id": transaction.get("to_account_id"),
-                "detail": transaction["detail"],
-                "document_files": transaction.get("document_files", []),  # Changed from document_record
-                "user_id": transaction["user_id"],
-                "transaction_date": transaction["transaction_date"],
-                "created_at": transaction["created_at"],
-                "updated_at": transaction["updated_at"]
-            })
+        # Get total count (skipped entirely when the client doesn't need it)
+        total_count = None
+        total_is_exact = None
+        if include_total:
+            total_count, total_is_exact = await count_transactions(user_id, account_id, query, total_mode)
         
-        return {
+        # Keyset pagination: continue strictly after the cursor position
+        page_query = query
+        if cursor:
+            try:
+                cursor_date, cursor_id = decode_cursor(cursor)
+            except ValueError as ve:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=str(ve)
+                )
+            page_query = {"$and": [query, {"$or": [
+                {"transaction_date": {"$lt": cursor_date}},
+                {"transaction_date": cursor_date, "_id": {"$lt": cursor_id}}
+            ]}]}
+        
+        # Get transactions sorted by transaction_date descending (_id breaks ties).
+        # One extra row is fetched to know whether another page exists.
+        transactions_cursor = transactions_collection.find(page_query, TRANSACTION_PROJECTION)\
+            .sort([("transaction_date", -1), ("_id", -1)])
+        if not cursor and offset:
+            transactions_cursor = transactions_cursor.skip(offset)
+        transactions_cursor = transactions_cursor.limit(limit + 1)
+        
+        page = await transactions_cursor.to_list(None)
+        has_more = len(page) > limit
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1]) if has_more else None
+        
+        transactions = [serialize_transaction(transaction) for transaction in page]
+        
+        # Serialized straight to bytes with orjson (no jsonable_encoder pass)
+        return ORJSONResponse({
             "transactions": transactions,  # Fixed: Return the list of transactions
             "count": len(transactions),
             "total": total_count,
+            "total_is_exact": total_is_exact,
             "limit": limit,
-            "offset": offset
-        }
+            "offset": offset,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching transactions: {str(e)}")
         raise HTTPException(
@@ -412,6 +778,125 @@ async def get_transactions(
             detail="Failed to fetch transactions"
         )
 
+@router.get("/export")
+async def export_transactions(
+    current_user: dict = Depends(get_current_user),
+    format: str = Query("csv", pattern="^(csv|ndjson|parquet)$", description="csv, ndjson or parquet"),
+    account_id: Optional[str] = Query(None, description="Filter by account ID"),
+    start_date: Optional[datetime] = Query(None, description="Only transactions on or after this date"),
+    end_date: Optional[datetime] = Query(None, description="Only transactions before this date"),
+    gzip: bool = Query(False, description="Gzip-compress the export")
+):
+    """
+    Stream all matching transactions, oldest first, in a single response.
+    The cursor is read and encoded batch by batch, so server memory stays
+    constant regardless of how much history is exported.
+    """
+    user_id = str(current_user["_id"])
+    if format == "parquet" and not parquet_available():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Parquet export is not available on this server"
+        )
+    
+    query = {"user_id": user_id}
+    if account_id:
+        await validate_account_filter(user_id, account_id)
+        query["account_ids"] = account_id
+    if start_date or end_date:
+        query["transaction_date"] = {}
+        if start_date:
+            query["transaction_date"]["$gte"] = start_date
+        if end_date:
+            query["transaction_date"]["$lt"] = end_date
+    
+    async def export_documents():
+        cursor = transactions_collection.find(query, EXPORT_PROJECTION, batch_size=EXPORT_BATCH_SIZE)\
+            .sort([("transaction_date", 1), ("_id", 1)])
+        try:
+            async for doc in cursor:
+                yield doc
+        finally:
+            await cursor.close()
+    
+    body = stream_export(export_documents(), format, EXPORT_BATCH_SIZE)
+    filename = f"transactions-{datetime.utcnow():%Y%m%d}.{format}"
+    media_type = EXPORT_MEDIA_TYPES[format]
+    if gzip:
+        body = gzip_stream(body)
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@router.get("/changes")
+async def get_transaction_changes(
+    current_user: dict = Depends(get_current_user),
+    since: Optional[str] = Query(None, description="next_token from the previous sync; omit for a full sync"),
+    limit: int = Query(500, ge=1, le=1000, description="Maximum upserts and deletes returned per call")
+):
+    """
+    Delta sync. Returns transactions created or updated since the token
+    (upserts) and deleted transactions/accounts (deletes), oldest first, at
+    most `limit` of each. Keep calling with next_token while has_more is
+    true. An unchanged account costs one empty index scan per stream.
+    Responds 410 if the token is older than the tombstone retention window.
+    """
+    user_id = str(current_user["_id"])
+    try:
+        upserts_position, deletes_position = decode_sync_token(since)
+    except SyncTokenExpired:
+        raise HTTPException(
+            status_code=status.HTTP_410_GONE,
+            detail="Sync token expired, start a full sync"
+        )
+    except ValueError as ve:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(ve)
+        )
+    
+    try:
+        upper_bound = sync_upper_bound()
+        upserts, deletes = await asyncio.gather(
+            transactions_collection.find(
+                {"user_id": user_id, **changed_after("updated_at", upserts_position, upper_bound)},
+                TRANSACTION_PROJECTION
+            ).sort([("updated_at", 1), ("_id", 1)]).limit(limit + 1).to_list(None),
+            tombstones_collection.find(
+                {"user_id": user_id, **changed_after("deleted_at", deletes_position, upper_bound)}
+            ).sort([("deleted_at", 1), ("_id", 1)]).limit(limit + 1).to_list(None)
+        )
+        
+        upserts_more = len(upserts) > limit
+        deletes_more = len(deletes) > limit
+        upserts, deletes = upserts[:limit], deletes[:limit]
+        next_token = encode_sync_token(
+            next_position("updated_at", upserts, upserts_more, upper_bound, upserts_position),
+            next_position("deleted_at", deletes, deletes_more, upper_bound, deletes_position)
+        )
+        
+        return ORJSONResponse({
+            "upserts": [serialize_transaction(transaction) for transaction in upserts],
+            "deletes": [
+                {"id": tombstone["object_id"], "type": tombstone["kind"], "deleted_at": tombstone["deleted_at"]}
+                for tombstone in deletes
+            ],
+            "next_token": next_token,
+            "has_more": upserts_more or deletes_more
+        })
+    
+    except Exception as e:
+        logger.error(f"Error fetching transaction changes: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to fetch transaction changes"
+        )
+
 @router.get("/{transaction_id}", response_model=dict)
 async def get_transaction(
     transaction_id: str,
@@ -428,10 +913,10 @@ async def get_transaction(
             )
         
         # Find transaction
-        transaction = transactions_collection.find_one({
+        transaction = await transactions_collection.find_one({
             "_id": obj_id,
             "user_id": str(current_user["_id"])
-        })
+        }, TRANSACTION_PROJECTION)
         
         if not transaction:
             raise HTTPException(
@@ -439,22 +924,10 @@ async def get_transaction(
                 detail="Transaction not found"
             )
         
-        return {
-            "transaction": {
-                "id": str(transaction["_id"]),
-                "type": transaction["type"],
-                "amount": transaction["amount"],
-                "from_account_id": transaction.get("from_account_id"),
-                "to_account_id": transaction.get("to_account_id"),
-                "detail": transaction["detail"],
-                "document_files": transaction.get("document_files", []),
-                "user_id": transaction["user_id"],
-                "transaction_date": transaction["transaction_date"],
-                "created_at": transaction["created_at"],
-                "updated_at": transaction["updated_at"]
-            }
-        }
+        return {"transaction": serialize_transaction(transaction)}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching transaction: {str(e)}")
         raise HTTPException(
@@ -480,60 +953,20 @@ async def update_transaction(
         
         user_id = str(current_user["_id"])
         
-        # Find existing transaction
-        existing_transaction = transactions_collection.find_one({
-            "_id": obj_id,
-            "user_id": user_id
-        })
-        
-        if not existing_transaction:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Transaction not found"
-            )
-        
-        
-        # Track files for cleanup if document_files is being updated
-        files_to_cleanup = []
-        if transaction_update.document_files is not None:
-            existing_files = existing_transaction.get("document_files", [])
-            new_files = transaction_update.document_files or []
-            
-            # Find files that are being removed
-            files_to_cleanup = [f for f in existing_files if f not in new_files]
+        # Validate account ownership (one query, only for accounts being set)
+        await validate_account_ownership(
+            user_id,
+            transaction_update.from_account_id,
+            transaction_update.to_account_id
+        )
         
         # Build update document
         update_doc = {"updated_at": datetime.utcnow()}
         
-        # Validate and update account IDs if provided
         if transaction_update.from_account_id is not None:
-            if transaction_update.from_account_id:
-                from_account = accounts_collection.find_one({
-                    "_id": ObjectId(transaction_update.from_account_id),
-                    "user_id": user_id
-                })
-                if not from_account:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="From account not found or does not belong to user"
-                    )
             update_doc["from_account_id"] = transaction_update.from_account_id
-        
         if transaction_update.to_account_id is not None:
-            if transaction_update.to_account_id:
-                to_account = accounts_collection.find_one({
-                    "_id": ObjectId(transaction_update.to_account_id),
-                    "user_id": user_id
-                })
-                if not to_account:
-                    raise HTTPException(
-                        status_code=status.HTTP_400_BAD_REQUEST,
-                        detail="To account not found or does not belong to user"
-                    )
             update_doc["to_account_id"] = transaction_update.to_account_id
-        
-        # Update other fields
-        # Update other fields
         if transaction_update.type is not None:
             update_doc["type"] = transaction_update.type.value
         if transaction_update.amount is not None:
@@ -544,49 +977,62 @@ async def update_transaction(
             update_doc["document_files"] = transaction_update.document_files
         if transaction_update.transaction_date is not None:
             update_doc["transaction_date"] = transaction_update.transaction_date
-
-
-
-        # Update transaction
-        result = transactions_collection.update_one(
+        
+        accounts_changed = "from_account_id" in update_doc or "to_account_id" in update_doc
+        if accounts_changed:
+            # Pipeline update so the denormalized account_ids is recomputed
+            # from the stored from/to in the same write
+            update = [
+                {"$set": {field: {"$literal": value} for field, value in update_doc.items()}},
+                {"$set": {"account_ids": {"$setDifference": [
+                    ["$from_account_id", "$to_account_id"],
+                    [None, ""]
+                ]}}}
+            ]
+        else:
+            update = {"$set": update_doc}
+        
+        # Update and fetch the previous version in a single round trip;
+        # the previous version is needed for balance and file bookkeeping
+        existing_transaction = await transactions_collection.find_one_and_update(
             {"_id": obj_id, "user_id": user_id},
-            {"$set": update_doc}
+            update,
+            return_document=ReturnDocument.BEFORE
         )
         
-        if result.matched_count == 0:
+        if not existing_transaction:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Transaction not found"
             )
         
-
-        # Clean up removed files from filesystem
-        if files_to_cleanup:
-            cleanup_result = cleanup_transaction_files(files_to_cleanup)
-            logger.info(f"Cleaned up {len(cleanup_result['deleted_files'])} files during transaction update")
-            if cleanup_result['failed_files']:
-                logger.warning(f"Failed to clean up some files: {cleanup_result['failed_files']}")
+        updated_transaction = {**existing_transaction, **update_doc}
+        if accounts_changed:
+            updated_transaction["account_ids"] = get_account_ids(
+                updated_transaction.get("from_account_id"),
+                updated_transaction.get("to_account_id")
+            )
+        await record_transaction_changes(
+            user_id,
+            old_docs=[existing_transaction],
+            new_docs=[updated_transaction]
+        )
         
-        # Get updated transaction
-        updated_transaction = transactions_collection.find_one({"_id": obj_id})
+        # Clean up files removed from the transaction (in the background)
+        if transaction_update.document_files is not None:
+            new_files = transaction_update.document_files
+            enqueue_file_deletion(
+                user_id,
+                (f for f in existing_transaction.get("document_files", []) if f not in new_files)
+            )
         
         return {
             "message": "Transaction updated successfully",
-            "transaction": {
-                "id": str(updated_transaction["_id"]),
-                "type": updated_transaction["type"],
-                "amount": updated_transaction["amount"],
-                "from_account_id": updated_transaction.get("from_account_id"),
-                "to_account_id": updated_transaction.get("to_account_id"),
-                "detail": updated_transaction["detail"],
-                "document_files": updated_transaction.get("document_files", []),  # Changed from document_record
-                "user_id": updated_transaction["user_id"],
-                "transaction_date": updated_transaction["transaction_date"],
-                "created_at": updated_transaction["created_at"],
-                "updated_at": updated_transaction["updated_at"]
-            }
+            "transaction": serialize_transaction(updated_transaction)
         }
         
+    except HTTPException:
+        raise
     except ValueError as ve:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -614,8 +1060,8 @@ async def delete_transaction(
                 detail="Invalid transaction ID"
             )
         
-        # First, get the transaction to access its files before deletion
-        transaction = transactions_collection.find_one({
+        # Delete the transaction, getting it back for its files and balances
+        transaction = await transactions_collection.find_one_and_delete({
             "_id": obj_id,
             "user_id": str(current_user["_id"])
         })
@@ -625,54 +1071,24 @@ async def delete_transaction(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Transaction not found"
             )
+        await record_transaction_changes(str(current_user["_id"]), old_docs=[transaction])
+        await record_tombstones(str(current_user["_id"]), "transaction", [transaction_id])
         
-        # Delete associated files from file system
-        document_files = transaction.get("document_files", [])
-        file_cleanup_result = cleanup_transaction_files(document_files)
-        deleted_files = file_cleanup_result["deleted_files"]
-        failed_files = file_cleanup_result["failed_files"]
-        
-        for filename in document_files:
-            if filename:  # Check if filename is not empty
-                file_path = os.path.join(UPLOAD_DIR, filename)
-                try:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                        deleted_files.append(filename)
-                        logger.info(f"Deleted file: {filename}")
-                    else:
-                        logger.warning(f"File not found for deletion: {filename}")
-                        failed_files.append(f"{filename} (not found)")
-                except Exception as file_error:
-                    logger.error(f"Error deleting file {filename}: {str(file_error)}")
-                    failed_files.append(f"{filename} (deletion error)")
-        
-        # Delete transaction from database
-        result = transactions_collection.delete_one({
-            "_id": obj_id,
-            "user_id": str(current_user["_id"])
-        })
-        
-        if result.deleted_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Transaction not found"
-            )
+        # Associated files are removed in the background
+        document_files = [f for f in transaction.get("document_files", []) if f]
+        enqueue_file_deletion(str(current_user["_id"]), document_files)
         
         # Prepare response message
         message = "Transaction deleted successfully"
-        if deleted_files:
-            message += f". {len(deleted_files)} file(s) removed"
-        if failed_files:
-            message += f". Warning: {len(failed_files)} file(s) could not be removed"
+        if document_files:
+            message += f". {len(document_files)} file(s) will be removed"
         
         response = {"message": message}
         
         # Add details about file operations if any files were involved
-        if deleted_files or failed_files:
+        if document_files:
             response["file_operations"] = {
-                "deleted_files": deleted_files,
-                "failed_files": failed_files
+                "scheduled_files": document_files
             }
         
         return response
@@ -697,46 +1113,13 @@ async def get_transaction_summary(
     try:
         user_id = str(current_user["_id"])
         
-        # Build query
-        query = {"user_id": user_id}
-        
         if account_id:
             # Validate account ownership
-            account = accounts_collection.find_one({
-                "_id": ObjectId(account_id),
-                "user_id": user_id
-            })
-            if not account:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Account not found or does not belong to user"
-                )
-            query["$or"] = [
-                {"from_account_id": account_id},
-                {"to_account_id": account_id}
-            ]
+            await validate_account_filter(user_id, account_id)
         
-        if start_date or end_date:
-            date_filter = {}
-            if start_date:
-                date_filter["$gte"] = start_date
-            if end_date:
-                date_filter["$lte"] = end_date
-            query["transaction_date"] = date_filter
-        
-        # Aggregate data
-        pipeline = [
-            {"$match": query},
-            {
-                "$group": {
-                    "_id": "$type",
-                    "total_amount": {"$sum": "$amount"},
-                    "count": {"$sum": 1}
-                }
-            }
-        ]
-        
-        results = list(transactions_collection.aggregate(pipeline))
+        # Composed from pre-aggregated month/day rollups plus the partial days
+        # at the edges of the range, so cost depends on buckets, not rows
+        results = await summarize_range(user_id, account_id, start_date, end_date)
         
         summary = {
             "total_inflow": 0,
@@ -746,22 +1129,69 @@ async def get_transaction_summary(
             "net_flow": 0
         }
         
-        for result in results:
-            if result["_id"] == "Inflow":
-                summary["total_inflow"] = result["total_amount"]
-                summary["inflow_count"] = result["count"]
-            elif result["_id"] == "Outflow":
-                summary["total_outflow"] = result["total_amount"]
-                summary["outflow_count"] = result["count"]
+        if "Inflow" in results:
+            summary["total_inflow"] = round(results["Inflow"]["total_amount"], 2)
+            summary["inflow_count"] = results["Inflow"]["count"]
+        if "Outflow" in results:
+            summary["total_outflow"] = round(results["Outflow"]["total_amount"], 2)
+            summary["outflow_count"] = results["Outflow"]["count"]
         
-        summary["net_flow"] = summary["total_inflow"] - summary["total_outflow"]
+        summary["net_flow"] = round(summary["total_inflow"] - summary["total_outflow"], 2)
         summary["total_transactions"] = summary["inflow_count"] + summary["outflow_count"]
         
         return {"summary": summary}
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting transaction summary: {str(e)}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to get transaction summary"
+        )
+
+@router.get("/analytics/timeseries", response_model=dict)
+async def get_transaction_timeseries(
+    current_user: dict = Depends(get_current_user),
+    interval: str = Query("day", pattern="^(day|week|month)$", description="Bucket size: day, week or month"),
+    account_id: Optional[str] = Query(None, description="Filter by account ID"),
+    group_by_account: bool = Query(False, description="Return one series per account"),
+    start_date: Optional[datetime] = Query(None, description="Start date filter (truncated to the bucket start; defaults to the first transaction, at most 1000 buckets back)"),
+    end_date: Optional[datetime] = Query(None, description="End date filter (defaults to now)")
+):
+    """
+    Bucketed cash flow with a running balance, as columnar arrays aligned
+    with "buckets" so charts can be drawn without downloading transactions.
+    """
+    try:
+        user_id = str(current_user["_id"])
+        
+        if account_id:
+            # Validate account ownership
+            await validate_account_filter(user_id, account_id)
+        
+        try:
+            timeseries = await build_timeseries(
+                user_id,
+                interval,
+                start_date=start_date,
+                end_date=end_date,
+                account_id=account_id,
+                group_by_account=group_by_account and not account_id
+            )
+        except ValueError as ve:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(ve)
+            )
+        
+        return {"timeseries": timeseries}
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error getting transaction timeseries: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to get transaction timeseries"
         )
\ No newline at end of file
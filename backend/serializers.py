@@ -0,0 +1,69 @@
+from typing import Any
+import orjson
+from starlette.responses import JSONResponse
+
+# Shared response serialization.
+#
+# Handlers turn MongoDB documents into plain dicts with these serializers
+# (ObjectId -> str, datetimes left as-is) and hot list endpoints return an
+# ORJSONResponse, which encodes datetimes natively and skips FastAPI's
+# jsonable_encoder pass. The projections fetch only the fields serialized.
+
+TRANSACTION_PROJECTION = {
+    "type": 1,
+    "amount": 1,
+    "from_account_id": 1,
+    "to_account_id": 1,
+    "detail": 1,
+    "document_files": 1,
+    "user_id": 1,
+    "transaction_date": 1,
+    "created_at": 1,
+    "updated_at": 1,
+}
+
+ACCOUNT_PROJECTION = {
+    "name": 1,
+    "account_type": 1,
+    "email": 1,
+    "phone_number": 1,
+    "user_id": 1,
+    "created_at": 1,
+    "updated_at": 1,
+}
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson (datetimes are written as ISO 8601)."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+def serialize_transaction(doc: dict, id_key: str = "id") -> dict:
+    return {
+        id_key: str(doc["_id"]),
+        "type": doc["type"],
+        "amount": doc["amount"],
+        "from_account_id": doc.get("from_account_id"),
+        "to_account_id": doc.get("to_account_id"),
+        "detail": doc["detail"],
+        "document_files": doc.get("document_files", []),
+        "user_id": doc["user_id"],
+        "transaction_date": doc["transaction_date"],
+        "created_at": doc["created_at"],
+        "updated_at": doc["updated_at"],
+    }
+
+
+def serialize_account(doc: dict) -> dict:
+    return {
+        "id": str(doc["_id"]),
+        "name": doc["name"],
+        "account_type": doc["account_type"],
+        "email": doc.get("email"),
+        "phone_number": doc.get("phone_number"),
+        "user_id": doc["user_id"],
+        "created_at": doc["created_at"],
+        "updated_at": doc["updated_at"],
+    }
@@ -0,0 +1,66 @@
+"""
+Production server: pre-forked uvicorn workers on uvloop and httptools.
+
+    python serve.py
+
+The parent binds the socket once and forks WEB_CONCURRENCY workers (default:
+one per core). Each worker runs the app's lifespan (connect to MongoDB, warm
+the connection and password pools) before it starts accepting connections
+from the shared socket.
+
+Rolling restart, e.g. after deploying new code:
+
+    kill -HUP <parent pid>
+
+Workers are replaced one at a time. Each replacement has to finish startup
+before the worker it replaces is stopped, so the socket is never left without
+warm workers; the stopped worker gets GRACEFUL_TIMEOUT seconds to finish its
+in-flight requests. SIGTTIN / SIGTTOU add or remove a worker. Rolling restarts
+need at least two workers.
+
+main.py's __main__ is the single-process development server with reload.
+"""
+import os
+import uvicorn
+from dotenv import load_dotenv
+
+load_dotenv()
+
+HOST = os.getenv("HOST", "0.0.0.0")
+PORT = int(os.getenv("PORT", "8000"))
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str(os.cpu_count() or 1)))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+# Seconds a new worker gets to finish startup (including warmup) during a
+# rolling restart before the restart is abandoned and the old worker kept
+WORKER_STARTUP_TIMEOUT = int(os.getenv("WORKER_STARTUP_TIMEOUT", "60"))
+KEEPALIVE_TIMEOUT = int(os.getenv("KEEPALIVE_TIMEOUT", "5"))
+# Recycle a worker after this many requests (plus up to MAX_REQUESTS_JITTER,
+# so workers don't all restart together); unset to never recycle
+MAX_REQUESTS = int(os.getenv("MAX_REQUESTS", "0")) or None
+MAX_REQUESTS_JITTER = int(os.getenv("MAX_REQUESTS_JITTER", "0"))
+ACCESS_LOG = os.getenv("ACCESS_LOG", "false").lower() == "true"
+FORWARDED_ALLOW_IPS = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def main():
+    uvicorn.run(
+        "main:app",
+        host=HOST,
+        port=PORT,
+        workers=WEB_CONCURRENCY,
+        loop="uvloop",
+        http="httptools",
+        lifespan="on",
+        timeout_graceful_shutdown=GRACEFUL_TIMEOUT,
+        timeout_worker_healthcheck=WORKER_STARTUP_TIMEOUT,
+        timeout_keep_alive=KEEPALIVE_TIMEOUT,
+        limit_max_requests=MAX_REQUESTS,
+        limit_max_requests_jitter=MAX_REQUESTS_JITTER,
+        access_log=ACCESS_LOG,
+        proxy_headers=True,
+        forwarded_allow_ips=FORWARDED_ALLOW_IPS
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import os
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import List, Optional, Tuple
+from bson import ObjectId
+from auth_utils import db
+
+# Delta sync: clients keep an opaque token and ask for what changed since.
+#
+# Upserts are read from transactions by an (updated_at, _id) watermark; deletes
+# come from tombstones written when a transaction or account is deleted. Each
+# stream advances independently inside the token. Only changes older than
+# SYNC_SETTLE_SECONDS are handed out, so a write stamped just before another
+# but committed just after it (or on a worker with a slightly different
+# clock) can't slip behind a client's watermark.
+
+tombstones_collection = db.sync_tombstones
+
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", "2"))
+
+MIN_OBJECT_ID = ObjectId("0" * 24)
+EPOCH = datetime(1970, 1, 1)
+
+Position = Tuple[datetime, ObjectId]
+
+
+class SyncTokenExpired(Exception):
+    """The token predates the tombstone retention window; a full resync is needed."""
+
+
+async def record_tombstones(user_id: str, kind: str, object_ids: List[str]):
+    """Remember deleted objects (kind is "transaction" or "account") for delta sync."""
+    if not object_ids:
+        return
+    deleted_at = datetime.utcnow()
+    await tombstones_collection.insert_many([
+        {"user_id": user_id, "kind": kind, "object_id": object_id, "deleted_at": deleted_at}
+        for object_id in object_ids
+    ])
+
+
+def sync_upper_bound() -> datetime:
+    return datetime.utcnow() - timedelta(seconds=SYNC_SETTLE_SECONDS)
+
+
+def encode_sync_token(upserts: Position, deletes: Position) -> str:
+    raw = json.dumps({
+        "u": [upserts[0].isoformat(), str(upserts[1])],
+        "d": [deletes[0].isoformat(), str(deletes[1])]
+    })
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_sync_token(token: Optional[str]) -> Tuple[Position, Position]:
+    """
+    Returns the (upserts, deletes) positions for a token. Without a token the
+    client starts from scratch: every transaction, and deletes from now on.
+    Raises ValueError if malformed, SyncTokenExpired if too old.
+    """
+    if not token:
+        return (EPOCH, MIN_OBJECT_ID), (sync_upper_bound(), MIN_OBJECT_ID)
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        raw = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        upserts = (datetime.fromisoformat(raw["u"][0]), ObjectId(raw["u"][1]))
+        deletes = (datetime.fromisoformat(raw["d"][0]), ObjectId(raw["d"][1]))
+    except Exception:
+        raise ValueError("Invalid sync token")
+
+    if deletes[0] < datetime.utcnow() - timedelta(days=TOMBSTONE_RETENTION_DAYS):
+        raise SyncTokenExpired()
+    return upserts, deletes
+
+
+def changed_after(field: str, position: Position, upper_bound: datetime) -> dict:
+    """Match documents strictly after position in (field, _id) order and before upper_bound."""
+    date, object_id = position
+    return {"$or": [
+        {field: {"$gt": date, "$lt": upper_bound}},
+        {field: date, "_id": {"$gt": object_id}}
+    ]}
+
+
+def next_position(field: str, page: List[dict], has_more: bool, upper_bound: datetime, position: Position) -> Position:
+    """
+    Where the next request continues. A drained stream jumps to the upper
+    bound so later polls scan only newer entries.
+    """
+    if has_more:
+        return page[-1][field], page[-1]["_id"]
+    return max(position, (upper_bound, MIN_OBJECT_ID))
@@ -0,0 +1,126 @@
+import os
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+# Pillow and pypdfium2 are optional (requirements-optional.txt): without them
+# uploads still work, the thumbnail queue just stays off and ?variant=thumb
+# serves the original.
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover
+    Image = None
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # pragma: no cover
+    pdfium = None
+
+# Background thumbnail generation for uploaded receipts.
+# Rendering runs in a process pool; an asyncio queue feeds it after uploads.
+THUMBNAIL_MAX_SIZE = int(os.getenv("THUMBNAIL_MAX_SIZE", "320"))
+THUMBNAIL_FORMAT = os.getenv("THUMBNAIL_FORMAT", "webp").lower()  # webp or jpeg
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", "2"))
+THUMBNAIL_QUEUE_SIZE = int(os.getenv("THUMBNAIL_QUEUE_SIZE", "1000"))
+THUMBNAIL_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.gif'}
+THUMBNAIL_SUFFIX = ".thumb.webp" if THUMBNAIL_FORMAT == "webp" else ".thumb.jpg"
+THUMBNAIL_CONTENT_TYPE = "image/webp" if THUMBNAIL_FORMAT == "webp" else "image/jpeg"
+
+logger = logging.getLogger(__name__)
+
+_queue: Optional[asyncio.Queue] = None
+_executor: Optional[ProcessPoolExecutor] = None
+_workers: list = []
+
+
+def thumbnails_enabled() -> bool:
+    return Image is not None
+
+
+def render_thumbnail(source_path: str, dest_path: str, max_size: int, fmt: str) -> bool:
+    """
+    Render a downscaled preview of an image, or of the first page of a PDF.
+    Runs in a worker process. Returns False if the file type is unsupported.
+    """
+    with open(source_path, "rb") as source:
+        is_pdf = source.read(5) == b"%PDF-"
+
+    if is_pdf:
+        if pdfium is None:
+            return False
+        pdf = pdfium.PdfDocument(source_path)
+        try:
+            page = pdf[0]
+            width, height = page.get_size()
+            image = page.render(scale=max_size / max(width, height, 1)).to_pil()
+        finally:
+            pdf.close()
+    else:
+        image = Image.open(source_path)
+        image = ImageOps.exif_transpose(image)
+
+    image.thumbnail((max_size, max_size))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+
+    temp_path = f"{dest_path}.part"
+    image.save(temp_path, format="WEBP" if fmt == "webp" else "JPEG", quality=80)
+    os.replace(temp_path, dest_path)
+    return True
+
+
+async def _thumbnail_worker():
+    loop = asyncio.get_running_loop()
+    while True:
+        source_path, dest_path = await _queue.get()
+        try:
+            if not os.path.exists(dest_path):
+                await loop.run_in_executor(
+                    _executor,
+                    render_thumbnail,
+                    source_path,
+                    dest_path,
+                    THUMBNAIL_MAX_SIZE,
+                    THUMBNAIL_FORMAT
+                )
+        except Exception as e:
+            logger.error(f"Error generating thumbnail for {source_path}: {e!r}")
+        finally:
+            _queue.task_done()
+
+
+async def start_thumbnail_workers():
+    global _queue, _executor, _workers
+    if not thumbnails_enabled():
+        logger.warning("Pillow is not installed; thumbnail generation is disabled")
+        return
+
+    _queue = asyncio.Queue(maxsize=THUMBNAIL_QUEUE_SIZE)
+    _executor = ProcessPoolExecutor(
+        max_workers=THUMBNAIL_WORKERS,
+        mp_context=multiprocessing.get_context("spawn")
+    )
+    _workers = [asyncio.create_task(_thumbnail_worker()) for _ in range(THUMBNAIL_WORKERS)]
+
+
+async def stop_thumbnail_workers():
+    global _queue, _executor, _workers
+    for worker in _workers:
+        worker.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _queue, _executor, _workers = None, None, []
+
+
+def enqueue_thumbnail(source_path: str, dest_path: str) -> bool:
+    """Queue a thumbnail render without waiting. Returns False if it was dropped."""
+    if _queue is None:
+        return False
+    try:
+        _queue.put_nowait((source_path, dest_path))
+        return True
+    except asyncio.QueueFull:
+        logger.warning(f"Thumbnail queue full, skipping {source_path}")
+        return False
@@ -19,7 +19,12 @@ class MyApp extends StatelessWidget {
       providers: [
         ChangeNotifierProvider(create: (context) => AuthProvider()),
         ChangeNotifierProvider(create: (context) => AccountProvider()),
-        ChangeNotifierProvider(create: (context) => TransactionProvider()),
+        ChangeNotifierProvider(
+          create: (context) => TransactionProvider(
+            // Keep the dashboard's total balance current after transaction writes
+            onTransactionsChanged: () => context.read<AccountProvider>().loadBalances(),
+          ),
+        ),
       ],
       child: MaterialApp(
         title: 'Finance Tracker',
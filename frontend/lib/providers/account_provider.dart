@@ -4,10 +4,14 @@ import '../services/account_service.dart';
 
 class AccountProvider with ChangeNotifier {
   List<Account> _accounts = [];
+  Map<String, double> _balances = {};
+  double _totalBalance = 0.0;
   bool _isLoading = false;
   String _errorMessage = '';
 
   List<Account> get accounts => _accounts;
+  Map<String, double> get balances => _balances;
+  double get totalBalance => _totalBalance;
   bool get isLoading => _isLoading;
   String get errorMessage => _errorMessage;
 
@@ -59,6 +63,24 @@ class AccountProvider with ChangeNotifier {
     _setLoading(false);
   }
 
+  // Balances are maintained server-side, so this is one small request
+  // instead of downloading the whole transaction history.
+  Future<void> loadBalances() async {
+    final result = await AccountService.getAccountBalances();
+
+    if (result['success']) {
+      _balances = result['balances'];
+      _totalBalance = result['total_balance'];
+      notifyListeners();
+    } else {
+      _errorMessage = result['message'];
+    }
+  }
+
+  double getAccountBalance(String accountId) {
+    return _balances[accountId] ?? 0.0;
+  }
+
 
   Future<bool> updateAccount({
   required String accountId,
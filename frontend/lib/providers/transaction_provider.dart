@@ -3,6 +3,12 @@ import '../models/transaction_model.dart';
 import '../services/transaction_service.dart';
 
 class TransactionProvider with ChangeNotifier {
+  TransactionProvider({this.onTransactionsChanged});
+
+  // Called after every successful write, e.g. to refresh the server-side
+  // account balances that the write changed.
+  final VoidCallback? onTransactionsChanged;
+
   List<Transaction> _transactions = [];
   bool _isLoading = false;
   String _errorMessage = '';
@@ -42,6 +48,7 @@ class TransactionProvider with ChangeNotifier {
 
   if (result['success']) {
     await loadTransactions(); // Reload transactions after creation
+    onTransactionsChanged?.call();
     _setLoading(false);
     return true;
   } else {
@@ -63,6 +70,7 @@ class TransactionProvider with ChangeNotifier {
 
     if (result['success']) {
       await loadTransactions(); // Reload transactions after creation
+      onTransactionsChanged?.call();
       _setLoading(false);
       return true;
     } else {
@@ -131,6 +139,7 @@ class TransactionProvider with ChangeNotifier {
       _transactions[index] = updatedTransaction;
       notifyListeners();
     }
+    onTransactionsChanged?.call();
     _setLoading(false);
     return true;
   } else {
@@ -149,6 +158,7 @@ class TransactionProvider with ChangeNotifier {
     if (result['success']) {
       _transactions.removeWhere((transaction) => transaction.id == transactionId);
       _totalCount = _totalCount > 0 ? _totalCount - 1 : 0;
+      onTransactionsChanged?.call();
       _setLoading(false);
       return true;
     } else {
@@ -24,6 +24,7 @@ class _DashboardScreenState extends State<DashboardScreen> {
     WidgetsBinding.instance.addPostFrameCallback((_) {
       // Ensure accounts and transactions are loaded
       Provider.of<AccountProvider>(context, listen: false).loadAccounts();
+      Provider.of<AccountProvider>(context, listen: false).loadBalances();
       Provider.of<TransactionProvider>(context, listen: false).loadTransactions();
     });
   }
@@ -82,6 +83,7 @@ class _DashboardScreenState extends State<DashboardScreen> {
                       onPressed: () {
                         // Retry loading both
                         Provider.of<AccountProvider>(context, listen: false).loadAccounts();
+                        Provider.of<AccountProvider>(context, listen: false).loadBalances();
                         Provider.of<TransactionProvider>(context, listen: false).loadTransactions();
                       },
                       child: const Text('Retry'),
@@ -200,7 +202,7 @@ class _DashboardScreenState extends State<DashboardScreen> {
                       child: SummaryCard(
                         // --- Update Total Balance ---
                         title: 'Total Balance',
-                        value: '\$${_calculateTotalBalance(accountProvider.accounts, transactionProvider).toStringAsFixed(2)}',
+                        value: '\$${accountProvider.totalBalance.toStringAsFixed(2)}',
                         icon: Icons.account_balance_wallet,
                         color: Colors.green,
                       ),
@@ -284,15 +286,6 @@ class _DashboardScreenState extends State<DashboardScreen> {
 
   // --- Helper methods to calculate data ---
 
-  // Calculates total balance across all accounts
-  double _calculateTotalBalance(List<Account> accounts, TransactionProvider transactionProvider) {
-    double balance = 0.0;
-    for (var account in accounts) {
-      balance += transactionProvider.getAccountBalance(account.id);
-    }
-    return balance;
-  }
-
   // Calculates net flow (inflow - outflow) for the current month
   double _calculateMonthlyNetFlow(List<Transaction> transactions) {
     final now = DateTime.now();
@@ -7,6 +7,7 @@ import '../../providers/account_provider.dart';
 import '../../providers/auth_provider.dart'; // Add this import for auth token
 import '../../models/transaction_model.dart';
 import '../../models/account_model.dart';
+import '../../services/transaction_service.dart';
 import '../../widgets/app_drawer.dart';
 import '../../widgets/file_viewer.dart'; // Add this import
 import 'add_transaction_screen.dart';
@@ -473,15 +474,29 @@ class TransactionCard extends StatelessWidget {
             itemBuilder: (context, index) {
               final filePath = filePaths[index];
               final fileName = filePath.split('_').last;
-              final isImage = ['jpg', 'jpeg', 'png', 'gif'].contains(
-                fileName.split('.').last.toLowerCase(),
+              final extension = fileName.split('.').last.toLowerCase();
+              final isImage = ['jpg', 'jpeg', 'png', 'gif'].contains(extension);
+              final fileIcon = Icon(
+                isImage ? Icons.image : Icons.insert_drive_file,
+                color: Colors.blue.shade700,
               );
 
               return ListTile(
-                leading: Icon(
-                  isImage ? Icons.image : Icons.insert_drive_file,
-                  color: Colors.blue.shade700,
-                ),
+                // Images and PDFs have a small server-rendered preview
+                leading: isImage || extension == 'pdf'
+                    ? SizedBox(
+                        width: 40,
+                        height: 40,
+                        child: Image.network(
+                          TransactionService.getFileUrl(filePath, variant: 'thumb'),
+                          headers: authToken != null ? {
+                            'Authorization': 'Bearer $authToken',
+                          } : {},
+                          fit: BoxFit.cover,
+                          errorBuilder: (context, error, stackTrace) => fileIcon,
+                        ),
+                      )
+                    : fileIcon,
                 title: Text(fileName),
                 subtitle: const Text('Tap to view'),
                 onTap: () {
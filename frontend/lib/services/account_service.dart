@@ -101,6 +101,51 @@ class AccountService {
   }
 
 
+  static Future<Map<String, dynamic>> getAccountBalances() async {
+    try {
+      final token = await AuthService.getToken();
+      if (token == null) {
+        return {
+          'success': false,
+          'message': 'No authentication token found',
+        };
+      }
+
+      final response = await http.get(
+        Uri.parse('$baseUrl/accounts/balances'),
+        headers: {
+          'Authorization': 'Bearer $token',
+        },
+      );
+
+      final responseData = json.decode(response.body);
+
+      if (response.statusCode == 200) {
+        final Map<String, double> balances = {
+          for (final balance in responseData['balances'] as List)
+            balance['account_id'] as String: (balance['balance'] as num).toDouble(),
+        };
+
+        return {
+          'success': true,
+          'balances': balances,
+          'total_balance': (responseData['total_balance'] as num).toDouble(),
+        };
+      } else {
+        return {
+          'success': false,
+          'message': responseData['detail'] ?? 'Failed to fetch balances',
+        };
+      }
+    } catch (e) {
+      return {
+        'success': false,
+        'message': 'Network error: $e',
+      };
+    }
+  }
+
+
   static Future<Map<String, dynamic>> updateAccount({
   required String accountId,
   required String name,
@@ -162,7 +207,12 @@ class AccountService {
   }
 }
 
-  static Future<Map<String, dynamic>> deleteAccount(String accountId) async {
+  // Linked transactions are deleted (or moved to [reassignTo]) in the
+  // background; 'job_id' is set when there were any, poll it with getJob.
+  static Future<Map<String, dynamic>> deleteAccount(
+    String accountId, {
+    String? reassignTo,
+  }) async {
     try {
       final token = await AuthService.getToken();
       if (token == null) {
@@ -172,8 +222,13 @@ class AccountService {
         };
       }
 
+      String url = '$baseUrl/accounts/$accountId';
+      if (reassignTo != null) {
+        url += '?reassign_to=$reassignTo';
+      }
+
       final response = await http.delete(
-        Uri.parse('$baseUrl/accounts/$accountId'),
+        Uri.parse(url),
         headers: {
           'Authorization': 'Bearer $token',
         },
@@ -181,10 +236,11 @@ class AccountService {
 
       final responseData = json.decode(response.body);
 
-      if (response.statusCode == 200) {
+      if (response.statusCode == 200 || response.statusCode == 202) {
         return {
           'success': true,
           'message': responseData['message'],
+          'job_id': responseData['job']?['id'] as String?,
         };
       } else {
         return {
@@ -199,4 +255,44 @@ class AccountService {
       };
     }
   }
+
+  // Status of a background job: 'status' is pending, running, completed or
+  // failed; 'processed' / 'total' report progress.
+  static Future<Map<String, dynamic>> getJob(String jobId) async {
+    try {
+      final token = await AuthService.getToken();
+      if (token == null) {
+        return {
+          'success': false,
+          'message': 'No authentication token found',
+        };
+      }
+
+      final response = await http.get(
+        Uri.parse('$baseUrl/jobs/$jobId'),
+        headers: {
+          'Authorization': 'Bearer $token',
+        },
+      );
+
+      final responseData = json.decode(response.body);
+
+      if (response.statusCode == 200) {
+        return {
+          'success': true,
+          'job': responseData['job'],
+        };
+      } else {
+        return {
+          'success': false,
+          'message': responseData['detail'] ?? 'Failed to fetch job status',
+        };
+      }
+    } catch (e) {
+      return {
+        'success': false,
+        'message': 'Network error: $e',
+      };
+    }
+  }
 }
\ No newline at end of file
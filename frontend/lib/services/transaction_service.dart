@@ -41,30 +41,31 @@ static Future<String> downloadFileToCache(String filename, {String? authToken})
     }
 
     final directory = await getTemporaryDirectory();
-    final fileName = filename.split('_').last; // Extract original filename
-    final filePath = '${directory.path}/$fileName';
+    // Cache by stored filename: original names can collide between receipts
+    final filePath = '${directory.path}/$filename';
     final file = File(filePath);
+    final etagFile = File('$filePath.etag');
 
-    // Check if file already exists in cache
-    if (await file.exists()) {
-      // Check if file is recent (less than 1 hour old)
-      final fileStat = await file.stat();
-      final now = DateTime.now();
-      final fileAge = now.difference(fileStat.modified);
-      
-      if (fileAge.inHours < 1) {
-        return filePath; // Return cached file if it's recent
-      }
+    final headers = {'Authorization': 'Bearer $token'};
+
+    // Revalidate a cached copy with its ETag; the server answers 304 without a body
+    if (await file.exists() && await etagFile.exists()) {
+      headers['If-None-Match'] = await etagFile.readAsString();
     }
 
-    // Download the file
     final response = await http.get(
       Uri.parse('$baseUrl/transactions/files/$filename'),
-      headers: {'Authorization': 'Bearer $token'},
+      headers: headers,
     );
 
-    if (response.statusCode == 200) {
+    if (response.statusCode == 304) {
+      return filePath;
+    } else if (response.statusCode == 200) {
       await file.writeAsBytes(response.bodyBytes);
+      final etag = response.headers['etag'];
+      if (etag != null) {
+        await etagFile.writeAsString(etag);
+      }
       return filePath;
     } else {
       throw Exception('Failed to download file: HTTP ${response.statusCode}');
@@ -416,8 +417,9 @@ static Future<String> downloadFileToCache(String filename, {String? authToken})
     }
   }
 
-  static String getFileUrl(String filename) {
-    return '$baseUrl/transactions/files/$filename';
+  static String getFileUrl(String filename, {String? variant}) {
+    final url = '$baseUrl/transactions/files/$filename';
+    return variant == null ? url : '$url?variant=$variant';
   }
 
   // ... rest of your existing methods remain the same ...
@@ -508,6 +510,7 @@ static Future<String> downloadFileToCache(String filename, {String? authToken})
   static Future<Map<String, dynamic>> getTransactions({
     int? limit,
     int? offset,
+    String? cursor,
     String? accountId,
   }) async {
     try {
@@ -521,7 +524,10 @@ static Future<String> downloadFileToCache(String filename, {String? authToken})
 
       if (limit != null) queryParams.add('limit=$limit');
       if (offset != null) queryParams.add('offset=$offset');
+      if (cursor != null) queryParams.add('cursor=$cursor');
       if (accountId != null) queryParams.add('account_id=$accountId');
+      // Use the server's per-user cached total instead of an exact count per page
+      queryParams.add('total_mode=cached');
 
       if (queryParams.isNotEmpty) {
         url += '?${queryParams.join('&')}';
@@ -553,6 +559,7 @@ static Future<String> downloadFileToCache(String filename, {String? authToken})
           'transactions': transactions,
           'count': responseData['count'] as int? ?? 0,
           'total': responseData['total'] as int? ?? 0,
+          'next_cursor': responseData['next_cursor'] as String?,
         };
       } else {
         return {
@@ -565,6 +572,68 @@ static Future<String> downloadFileToCache(String filename, {String? authToken})
     }
   }
 
+  // Delta sync: transactions changed and objects deleted since [since].
+  // Pass null for a full sync; keep calling with 'next_token' while 'has_more'.
+  // 'expired' means the token is too old and a full sync is needed.
+  static Future<Map<String, dynamic>> getTransactionChanges({
+    String? since,
+    int? limit,
+  }) async {
+    try {
+      final token = await AuthService.getToken();
+      if (token == null) {
+        return {'success': false, 'message': 'No authentication token found'};
+      }
+
+      List<String> queryParams = [];
+      if (since != null) queryParams.add('since=$since');
+      if (limit != null) queryParams.add('limit=$limit');
+
+      String url = '$baseUrl/transactions/changes';
+      if (queryParams.isNotEmpty) {
+        url += '?${queryParams.join('&')}';
+      }
+
+      final response = await http.get(
+        Uri.parse(url),
+        headers: {'Authorization': 'Bearer $token'},
+      );
+
+      final responseData = json.decode(response.body);
+
+      if (response.statusCode == 200) {
+        final List<dynamic> upsertsData = responseData['upserts'] ?? [];
+        final List<dynamic> deletesData = responseData['deletes'] ?? [];
+
+        return {
+          'success': true,
+          'upserts': upsertsData
+              .whereType<Map<String, dynamic>>()
+              .map((transactionJson) => Transaction.fromJson(transactionJson))
+              .toList(),
+          'deleted_transaction_ids': deletesData
+              .where((d) => d['type'] == 'transaction')
+              .map((d) => d['id'] as String)
+              .toList(),
+          'deleted_account_ids': deletesData
+              .where((d) => d['type'] == 'account')
+              .map((d) => d['id'] as String)
+              .toList(),
+          'next_token': responseData['next_token'] as String?,
+          'has_more': responseData['has_more'] as bool? ?? false,
+        };
+      } else {
+        return {
+          'success': false,
+          'expired': response.statusCode == 410,
+          'message': responseData['detail'] as String? ?? 'Failed to fetch transaction changes',
+        };
+      }
+    } catch (e) {
+      return {'success': false, 'message': 'Network error: $e'};
+    }
+  }
+
   static Future<Map<String, dynamic>> updateTransaction({
     required String transactionId,
     required String type,
@@ -26,6 +26,9 @@ class _FileViewerState extends State<FileViewer> {
   late int _currentIndex;
   bool _isLoading = false;
   String _message = '';
+  // Images open as the server-rendered thumbnail; the original is only
+  // fetched once the user taps or zooms into it
+  final Set<String> _fullSizeImages = {};
 
   @override
   void initState() {
@@ -575,61 +578,93 @@ class _FileViewerState extends State<FileViewer> {
     }
   }
 
+  void _loadFullSizeImage(String filePath) {
+    if (!_fullSizeImages.contains(filePath)) {
+      setState(() {
+        _fullSizeImages.add(filePath);
+      });
+    }
+  }
+
   Widget _buildImageViewer(String filePath) {
-    final imageUrl = TransactionService.getFileUrl(filePath);
+    final fullSize = _fullSizeImages.contains(filePath);
+    final imageUrl = TransactionService.getFileUrl(
+      filePath,
+      variant: fullSize ? null : 'thumb',
+    );
     
-    return InteractiveViewer(
-      minScale: 0.5,
-      maxScale: 3.0,
-      child: Image.network(
-        imageUrl,
-        headers: widget.authToken != null ? {
-          'Authorization': 'Bearer ${widget.authToken}',
-        } : {},
-        fit: BoxFit.contain,
-        loadingBuilder: (context, child, loadingProgress) {
-          if (loadingProgress == null) return child;
-          return Center(
-            child: CircularProgressIndicator(
-              value: loadingProgress.expectedTotalBytes != null
-                  ? loadingProgress.cumulativeBytesLoaded /
-                      loadingProgress.expectedTotalBytes!
-                  : null,
-              valueColor: const AlwaysStoppedAnimation<Color>(Colors.white),
-            ),
-          );
-        },
-        errorBuilder: (context, error, stackTrace) {
-          return Center(
-            child: Column(
-              mainAxisAlignment: MainAxisAlignment.center,
-              children: [
-                const Icon(
-                  Icons.error_outline,
-                  color: Colors.white,
-                  size: 64,
-                ),
-                const SizedBox(height: 16),
-                const Text(
-                  'Failed to load image',
-                  style: TextStyle(color: Colors.white),
-                ),
-                const SizedBox(height: 8),
-                Text(
-                  'Error: ${error.toString()}',
-                  style: const TextStyle(color: Colors.white70, fontSize: 12),
-                  textAlign: TextAlign.center,
-                ),
-                const SizedBox(height: 16),
-                ElevatedButton.icon(
-                  onPressed: () => setState(() {}),
-                  icon: const Icon(Icons.refresh),
-                  label: const Text('Retry'),
-                ),
-              ],
-            ),
-          );
+    return GestureDetector(
+      onTap: () => _loadFullSizeImage(filePath),
+      child: InteractiveViewer(
+        minScale: 0.5,
+        maxScale: 3.0,
+        onInteractionStart: (details) {
+          if (details.pointerCount > 1) _loadFullSizeImage(filePath);
         },
+        child: Image.network(
+          imageUrl,
+          headers: widget.authToken != null ? {
+            'Authorization': 'Bearer ${widget.authToken}',
+          } : {},
+          fit: BoxFit.contain,
+          // Keep showing the thumbnail while the original loads
+          gaplessPlayback: true,
+          loadingBuilder: (context, child, loadingProgress) {
+            if (loadingProgress == null) return child;
+            if (fullSize) {
+              // The thumbnail stays visible underneath (gaplessPlayback)
+              return Stack(
+                children: [
+                  Positioned.fill(child: child),
+                  const Align(
+                    alignment: Alignment.topCenter,
+                    child: LinearProgressIndicator(),
+                  ),
+                ],
+              );
+            }
+            return Center(
+              child: CircularProgressIndicator(
+                value: loadingProgress.expectedTotalBytes != null
+                    ? loadingProgress.cumulativeBytesLoaded /
+                        loadingProgress.expectedTotalBytes!
+                    : null,
+                valueColor: const AlwaysStoppedAnimation<Color>(Colors.white),
+              ),
+            );
+          },
+          errorBuilder: (context, error, stackTrace) {
+            return Center(
+              child: Column(
+                mainAxisAlignment: MainAxisAlignment.center,
+                children: [
+                  const Icon(
+                    Icons.error_outline,
+                    color: Colors.white,
+                    size: 64,
+                  ),
+                  const SizedBox(height: 16),
+                  const Text(
+                    'Failed to load image',
+                    style: TextStyle(color: Colors.white),
+                  ),
+                  const SizedBox(height: 8),
+                  Text(
+                    'Error: ${error.toString()}',
+                    style: const TextStyle(color: Colors.white70, fontSize: 12),
+                    textAlign: TextAlign.center,
+                  ),
+                  const SizedBox(height: 16),
+                  ElevatedButton.icon(
+                    onPressed: () => setState(() {}),
+                    icon: const Icon(Icons.refresh),
+                    label: const Text('Retry'),
+                  ),
+                ],
+              ),
+            );
+          },
+        ),
       ),
     );
   }